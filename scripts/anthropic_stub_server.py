@@ -0,0 +1,155 @@
+"""
+Anthropic Messages API 本地模拟服务, 用于在没有API密钥的情况下测试 Claude 客户端的流式工具调用与提示词缓存
+
+用法(不需要Blender):
+    python scripts/anthropic_stub_server.py [--port 45802] [--tool get_scene_info] [--input "{}"] [--prefill-ms 20]
+
+    偏好设置中选择 Claude, base url 设置为 http://127.0.0.1:45802, API密钥任意填写
+
+模拟行为:
+    - 最后一个内容块不是 tool_result 且请求中有 --tool 指定的工具时, 以 input_json_delta 分片流式返回一次工具调用, 否则返回文本
+    - 按 cache_control 断点计算缓存: 断点(及其之前 --lookback 个块)的前缀(tools -> system -> messages)出现过时计入 cache_read_input_tokens,
+      其余到最后一个断点为止的部分计入 cache_creation_input_tokens, 前缀小于 --min-cache-tokens 时不缓存; Token数按字符数/4估算
+    - 首Token延迟按未命中缓存的Token数模拟: 每1000 Token --prefill-ms 毫秒
+"""
+
+import json
+import asyncio
+import hashlib
+import argparse
+from uuid import uuid4
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+MODEL = "claude-stub"
+cache: set[str] = set()
+args: argparse.Namespace = None
+
+
+def count_tokens(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False)) // 4
+
+
+def iter_prefix_blocks(body: dict):
+    """
+    按缓存前缀顺序遍历所有块: tools -> system -> messages 中的内容块
+    """
+    for tool in body.get("tools") or []:
+        yield tool
+    system = body.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    yield from system
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for block in content:
+            yield {"role": message.get("role"), **block}
+
+
+def compute_usage(body: dict) -> dict:
+    """
+    与官方行为一致: 每个断点处向前最多回溯 lookback 个块查找已缓存的前缀, 请求结束后写入所有断点前缀
+    """
+    digest = hashlib.sha256()
+    tokens = 0
+    prefixes: list[tuple[str, int]] = []
+    breakpoints: list[int] = []
+    for block in iter_prefix_blocks(body):
+        plain = {k: v for k, v in block.items() if k != "cache_control"}
+        digest.update(json.dumps(plain, sort_keys=True, ensure_ascii=False).encode())
+        tokens += count_tokens(plain)
+        prefixes.append((digest.hexdigest(), tokens))
+        if "cache_control" in block:
+            breakpoints.append(len(prefixes) - 1)
+    cached = 0
+    for position in breakpoints:
+        for key, t in prefixes[max(position - args.lookback, 0) : position + 1]:
+            if key in cache:
+                cached = max(cached, t)
+    written = 0
+    for position in breakpoints:
+        key, t = prefixes[position]
+        if t >= args.min_cache_tokens:
+            cache.add(key)
+            written = max(written, t)
+    written = max(written - cached, 0)
+    return {"input_tokens": tokens - cached - written, "cache_read_input_tokens": cached, "cache_creation_input_tokens": written}
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def make_blocks(body: dict) -> list[dict]:
+    messages = body.get("messages", [])
+    content = messages[-1].get("content") if messages else []
+    # 工具结果之后紧跟新的用户文本时视为新请求
+    has_result = isinstance(content, list) and bool(content) and content[-1].get("type") == "tool_result"
+    tool_names = {tool.get("name") for tool in body.get("tools") or []}
+    if not has_result and args.tool in tool_names:
+        return [{"type": "text", "text": f"Calling {args.tool}."}, {"type": "tool_use", "id": f"toolu_{uuid4().hex[:16]}", "name": args.tool, "input": args.input}]
+    return [{"type": "text", "text": "Done." if has_result else "Hello from the Anthropic stub server."}]
+
+
+async def stream_message(body: dict, usage: dict):
+    blocks = make_blocks(body)
+    uncached = usage["input_tokens"] + usage["cache_creation_input_tokens"]
+    yield sse({"type": "message_start", "message": {"id": f"msg_{uuid4().hex[:16]}", "type": "message", "role": "assistant", "model": body.get("model", MODEL), "content": [], "usage": {**usage, "output_tokens": 1}}})
+    yield sse({"type": "ping"})
+    await asyncio.sleep(uncached / 1000 * args.prefill_ms / 1000)
+    for index, block in enumerate(blocks):
+        if block["type"] == "text":
+            yield sse({"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}})
+            for i in range(0, len(block["text"]), 8):
+                yield sse({"type": "content_block_delta", "index": index, "delta": {"type": "text_delta", "text": block["text"][i : i + 8]}})
+        else:
+            yield sse({"type": "content_block_start", "index": index, "content_block": {**block, "input": {}}})
+            arguments = json.dumps(block["input"], ensure_ascii=False)
+            for i in range(0, len(arguments), 5):
+                yield sse({"type": "content_block_delta", "index": index, "delta": {"type": "input_json_delta", "partial_json": arguments[i : i + 5]}})
+        yield sse({"type": "content_block_stop", "index": index})
+    stop_reason = "tool_use" if blocks[-1]["type"] == "tool_use" else "end_turn"
+    yield sse({"type": "message_delta", "delta": {"stop_reason": stop_reason, "stop_sequence": None}, "usage": {"output_tokens": count_tokens(blocks)}})
+    yield sse({"type": "message_stop"})
+
+
+async def messages(request: Request):
+    if request.headers.get("anthropic-version") is None:
+        return JSONResponse({"type": "error", "error": {"type": "invalid_request_error", "message": "anthropic-version header is required"}}, status_code=400)
+    body = await request.json()
+    if "max_tokens" not in body or not body.get("messages"):
+        return JSONResponse({"type": "error", "error": {"type": "invalid_request_error", "message": "max_tokens and messages are required"}}, status_code=400)
+    usage = compute_usage(body)
+    print(f"messages: {len(body['messages'])}  tools: {len(body.get('tools') or [])}  usage: {usage}", flush=True)
+    if not body.get("stream"):
+        return JSONResponse({"type": "message", "role": "assistant", "content": make_blocks(body), "usage": usage})
+    return StreamingResponse(stream_message(body, usage), media_type="text/event-stream")
+
+
+async def models(request: Request):
+    return JSONResponse({"data": [{"id": MODEL, "type": "model"}]})
+
+
+def main():
+    global args
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=45802)
+    parser.add_argument("--tool", default="get_scene_info", help="首轮调用的工具名")
+    parser.add_argument("--input", type=json.loads, default={}, help="工具参数(JSON)")
+    parser.add_argument("--prefill-ms", type=float, default=20, help="每1000个未缓存Token的模拟首Token延迟(毫秒)")
+    parser.add_argument("--min-cache-tokens", type=int, default=1024, help="可缓存前缀的最小Token数")
+    parser.add_argument("--lookback", type=int, default=20, help="断点处向前查找缓存的块数")
+    args = parser.parse_args()
+    app = Starlette(routes=[Route("/v1/messages", messages, methods=["POST"]), Route("/v1/models", models)])
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+流式工具参数完整性判断: 旧实现(每个片段后对累计参数 eval + json.loads) vs JsonStreamScanner(只扫描新增片段)
+
+用法(不需要Blender):
+    python scripts/bench_json_stream.py [录制文件.jsonl]
+
+录制文件每行为一个工具调用的参数片段列表(JSON数组), 例如 ["{\\"code\\": \\"", "import bpy", "\\"}"]
+未提供时使用生成的流: 小参数调用以及 2KB/20KB 的 execute_blender_code 代码参数, 按大模型常见的 1~8 字符片段切分
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import importlib.util
+from pathlib import Path
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+spec = importlib.util.spec_from_file_location("json_stream", ADDON_DIR / "src/client/json_stream.py")
+json_stream = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(json_stream)
+JsonStreamScanner = json_stream.JsonStreamScanner
+
+
+def legacy_parse_arguments(arguments: str):
+    arguments = arguments.strip()
+    if not arguments.startswith("{") or not arguments.endswith("}"):
+        raise json.JSONDecodeError("参数格式错误", arguments, 0)
+    try:
+        return eval(arguments, {"math": math, "random": random})
+    except Exception:
+        pass
+    return json.loads(arguments)
+
+
+def legacy_run(fragments: list[str]) -> int:
+    arguments = ""
+    for i, fragment in enumerate(fragments):
+        arguments += fragment
+        try:
+            legacy_parse_arguments(arguments)
+            return i
+        except Exception:
+            continue
+    return -1
+
+
+def scanner_run(fragments: list[str]) -> int:
+    arguments = ""
+    scanner = JsonStreamScanner()
+    for i, fragment in enumerate(fragments):
+        arguments += fragment
+        if not scanner.feed(arguments[scanner.consumed :]) and not scanner.error:
+            continue
+        try:
+            legacy_parse_arguments(arguments)
+            return i
+        except Exception:
+            continue
+    return -1
+
+
+def make_code(size: int) -> str:
+    lines = []
+    while sum(len(line) + 1 for line in lines) < size:
+        i = len(lines)
+        lines.append(f'obj = bpy.data.objects.new("Cube.{i:04d}", None)  # {{"index": {i}, "tags": ["a", "b"]}}')
+        lines.append(f"obj.location = ({i * 0.5:.2f}, {math.sin(i):.3f}, 0.0)")
+        lines.append('print("done: \\\\ \\"quoted\\"")')
+    return "\n".join(lines)
+
+
+def split_stream(text: str, rng: random.Random) -> list[str]:
+    fragments = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 8)
+        fragments.append(text[pos : pos + step])
+        pos += step
+    return fragments
+
+
+def generated_streams() -> dict[str, list[list[str]]]:
+    rng = random.Random(0)
+    small = [json.dumps({"name": f"Cube.{i}", "location": [i, 2.5, 3.0], "scale": [1, 1, 1]}) for i in range(50)]
+    return {
+        "small x50": [split_stream(s, rng) for s in small],
+        "code 2KB": [split_stream(json.dumps({"code": make_code(2 * 1024)}), rng)],
+        "code 20KB": [split_stream(json.dumps({"code": make_code(20 * 1024)}), rng)],
+    }
+
+
+def load_streams(path: str) -> dict[str, list[list[str]]]:
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return {Path(path).name: [json.loads(line) for line in lines if line.strip()]}
+
+
+def bench(func, streams: list[list[str]]) -> tuple[float, list[int]]:
+    start = time.perf_counter()
+    results = [func(fragments) for fragments in streams]
+    return time.perf_counter() - start, results
+
+
+def main():
+    groups = load_streams(sys.argv[1]) if len(sys.argv) > 1 else generated_streams()
+    for name, streams in groups.items():
+        legacy, legacy_results = bench(legacy_run, streams)
+        current, current_results = bench(scanner_run, streams)
+        assert legacy_results == current_results, "完成位置不一致"
+        fragments = sum(len(s) for s in streams)
+        print(f"{name:12s} fragments: {fragments:6d}  legacy: {legacy * 1000:9.2f} ms  scanner: {current * 1000:7.2f} ms  x{legacy / current:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+rounding_dumps 性能对比: 旧实现(dumps -> loads(parse_float) -> dumps) vs 单次遍历取整实现(可选 orjson)
+
+用法(需要在Blender环境中运行):
+    blender -b --factory-startup --python scripts/bench_rounding_dumps.py -- [对象数量]
+"""
+
+import sys
+import json
+import time
+import random
+import importlib
+from pathlib import Path
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, ADDON_DIR.parent.as_posix())
+utils = importlib.import_module(f"{ADDON_DIR.name}.src.server.utils")
+
+
+def legacy_rounding_dumps(obj, *args, precision=2, **kwargs):
+    d1 = json.dumps(obj, *args, **kwargs)
+    l1 = json.loads(d1, parse_float=lambda x: round(float(x), precision))
+    return json.dumps(l1, *args, **kwargs)
+
+
+def make_scene_payload(count: int) -> dict:
+    def vec():
+        return tuple(random.uniform(-100, 100) for _ in range(3))
+
+    objects = []
+    for i in range(count):
+        objects.append(
+            {
+                "name": f"Object.{i:05d}",
+                "type": "MESH",
+                "location": vec(),
+                "rotation": vec(),
+                "scale": (1.0, 1.0, 1.0),
+                "visible": True,
+                "bound_box": [vec() for _ in range(8)],
+                "materials": [f"Material.{i % 32:03d}"],
+            }
+        )
+    return {"name": "Scene", "object_count": count, "objects": objects, "materials_count": 32}
+
+
+def bench(func, payload, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(payload, ensure_ascii=False)
+        best = min(best, time.perf_counter() - start)
+        size = len(result)
+    return best, size
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    count = int(argv[0]) if argv else 10000
+    payload = make_scene_payload(count)
+    print(f"objects: {count}, orjson: {'yes' if utils.orjson else 'no'}")
+    legacy_time, legacy_size = bench(legacy_rounding_dumps, payload, 5)
+    print(f"legacy       : {legacy_time * 1000:8.1f} ms  {legacy_size} chars")
+    new_time, new_size = bench(utils.rounding_dumps, payload, 5)
+    print(f"rounding_dumps: {new_time * 1000:8.1f} ms  {new_size} chars  x{legacy_time / new_time:.2f}")
+    # 结果一致性(忽略orjson的紧凑分隔符差异)
+    assert json.loads(legacy_rounding_dumps(payload)) == json.loads(utils.rounding_dumps(payload, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+工具注册耗时: 旧实现(每次注册后 asyncio.run(list_tools()) 取最后一个) vs BlenderMCPServer.add_tool(schema缓存未命中/命中)
+
+用法(需要在Blender环境中运行):
+    blender -b --factory-startup --python scripts/bench_tool_registration.py -- [工具数量]
+"""
+
+import re
+import sys
+import time
+import asyncio
+import importlib
+from pathlib import Path
+
+from mcp.server.fastmcp import FastMCP
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, ADDON_DIR.parent.as_posix())
+server_module = importlib.import_module(f"{ADDON_DIR.name}.src.server.server")
+
+
+class LegacyServer(FastMCP):
+    def add_tool(self, *arg, **kwargs):
+        res = super().add_tool(*arg, **kwargs)
+        tool = asyncio.run(self.list_tools())[-1]
+        properties = tool.inputSchema["properties"]
+        description = tool.description
+        for name, info in properties.items():
+            find_description = re.search(f"- {name}: (.*)\\n", description)
+            if not find_description:
+                continue
+            info["description"] = find_description.group(1)
+        return res
+
+
+def make_tool(index: int, param_count: int = 6):
+    params = ", ".join(f"p{i}: float = {i}.0" for i in range(param_count))
+    args_doc = "\n".join(f"        - p{i}: Parameter {i} of tool {index}" for i in range(param_count))
+    namespace = {}
+    exec(f'def tool_{index}({params}) -> dict:\n    """\n    Synthetic tool {index}.\n\n    Args:\n{args_doc}\n    """\n    return {{}}\n', namespace)
+    return namespace[f"tool_{index}"]
+
+
+def bench(server_class, tools) -> float:
+    server = server_class(name="bench")
+    start = time.perf_counter()
+    for tool in tools:
+        server.add_tool(tool)
+    elapsed = time.perf_counter() - start
+    schemas = asyncio.run(server.list_tools())
+    assert len(schemas) == len(tools)
+    assert schemas[-1].inputSchema["properties"]["p0"]["description"].startswith("Parameter 0")
+    return elapsed
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    counts = [int(a) for a in argv] or [100, 300, 600]
+    cache = server_module.ToolSchemaCache
+    # 不读写磁盘缓存
+    cache.loaded = True
+    for count in counts:
+        tools = [make_tool(i) for i in range(count)]
+        legacy = bench(LegacyServer, tools)
+        cache.functions.clear()
+        cold = bench(server_module.BlenderMCPServer, tools)
+        warm = bench(server_module.BlenderMCPServer, tools)
+        print(
+            f"tools: {count:4d}  legacy: {legacy * 1000:8.1f} ms  "
+            f"add_tool(cold): {cold * 1000:8.1f} ms x{legacy / cold:.1f}  "
+            f"add_tool(cached): {warm * 1000:8.1f} ms x{legacy / warm:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
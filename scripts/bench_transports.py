@@ -0,0 +1,117 @@
+"""
+MCP传输方式延迟对比: sse vs streamable-http vs memory(内置客户端)
+
+用法:
+    # 不需要Blender: 本地启动两个FastMCP服务器(分别使用sse/streamable-http), 调用一个空工具
+    python scripts/bench_transports.py [调用次数]
+
+    # 对正在运行的创世核心测试(偏好设置中切换传输方式后分别运行), 默认调用 get_executor_stats(不进入主线程)
+    python scripts/bench_transports.py 200 --url http://localhost:45677/sse
+    python scripts/bench_transports.py 200 --url http://localhost:45677/mcp --tool get_executor_stats
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from threading import Thread
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+HOST = "127.0.0.1"
+SSE_PORT = 45691
+HTTP_PORT = 45692
+
+
+def make_server(port: int) -> FastMCP:
+    server = FastMCP("BenchServer", host=HOST, port=port, log_level="WARNING")
+
+    @server.tool()
+    def echo(value: int) -> int:
+        return value
+
+    return server
+
+
+def start_server(server: FastMCP, transport: str):
+    Thread(target=server.run, kwargs={"transport": transport}, daemon=True).start()
+
+
+async def wait_ready(url: str, connect, timeout: float = 10):
+    start = time.perf_counter()
+    while True:
+        try:
+            async with connect(url) as streams:
+                async with ClientSession(*streams[:2]) as session:
+                    await session.initialize()
+                    return
+        except Exception:
+            if time.perf_counter() - start > timeout:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def bench_session(session: ClientSession, tool: str, arguments: dict, count: int) -> list[float]:
+    # 预热
+    for _ in range(5):
+        await session.call_tool(tool, arguments)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await session.call_tool(tool, arguments)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def bench_url(url: str, tool: str, arguments: dict, count: int) -> list[float]:
+    connect = sse_client if url.rstrip("/").endswith("/sse") else streamablehttp_client
+    async with connect(url) as streams:
+        async with ClientSession(*streams[:2]) as session:
+            await session.initialize()
+            return await bench_session(session, tool, arguments, count)
+
+
+async def bench_memory(server: FastMCP, tool: str, arguments: dict, count: int) -> list[float]:
+    async with create_connected_server_and_client_session(server._mcp_server) as session:
+        return await bench_session(session, tool, arguments, count)
+
+
+def report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:16s} calls: {len(samples):5d}  avg: {statistics.mean(samples):7.3f} ms  p50: {statistics.median(samples):7.3f} ms  p95: {p95:7.3f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", type=int, nargs="?", default=500)
+    parser.add_argument("--url", help="已运行的MCP服务器地址(以/sse结尾时使用sse, 否则使用streamable-http)")
+    parser.add_argument("--tool", default="get_executor_stats")
+    args = parser.parse_args(sys.argv[1:])
+
+    if args.url:
+        report(args.url, await bench_url(args.url, args.tool, {}, args.count))
+        return
+
+    sse_server = make_server(SSE_PORT)
+    http_server = make_server(HTTP_PORT)
+    start_server(sse_server, "sse")
+    start_server(http_server, "streamable-http")
+    sse_url = f"http://{HOST}:{SSE_PORT}{sse_server.settings.sse_path}"
+    http_url = f"http://{HOST}:{HTTP_PORT}{http_server.settings.streamable_http_path}"
+    await wait_ready(sse_url, sse_client)
+    await wait_ready(http_url, streamablehttp_client)
+
+    arguments = {"value": 1}
+    report("sse", await bench_url(sse_url, "echo", arguments, args.count))
+    report("streamable-http", await bench_url(http_url, "echo", arguments, args.count))
+    report("memory", await bench_memory(sse_server, "echo", arguments, args.count))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
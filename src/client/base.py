@@ -4,17 +4,23 @@ import math
 import random
 import queue
 import asyncio
+import httpx
 import requests
-from threading import Thread
-from copy import deepcopy
+from importlib.util import find_spec
+from threading import Thread, Lock
 from dataclasses import dataclass
 from typing import Union, Literal
 from contextlib import AsyncExitStack
 from mcp import ClientSession
+from mcp.types import Implementation, ServerNotification, ToolListChangedNotification
 from mcp.client.sse import sse_client
-from ..timer import Timer
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.memory import create_connected_server_and_client_session
+from ..server.sessions import BUILTIN_CLIENT_NAME
 from ..logger import getLogger
 from ..utils import BTextWriter
+from .json_stream import JsonStreamScanner
+from .history import HistoryManager
 
 logger = getLogger("  BlenderClient")
 
@@ -57,6 +63,13 @@ class ResponseParser:
 class MCPClientBase:
     client_pools: dict[object, "MCPClientBase"] = {}
     __clients__: dict[str, "MCPClientBase"] = {}
+    # memory: 与同进程的MCP服务器通过内存流直连(默认), http: 按服务器配置的传输方式(sse/streamable-http)连接
+    transport: Literal["memory", "http"] = "memory"
+    # 同一轮中的多个修改类工具调用通过此工具合并执行
+    batch_tool = "batch_execute"
+    # 请求大模型服务的超时时间(秒): 连接超时/流式读取两次数据之间的最长间隔
+    connect_timeout = 10.0
+    read_timeout = 120.0
 
     def __init__(self, base_url="https://api.deepseek.com", api_key="", model="", stream=True):
         self._base_url = ""
@@ -65,17 +78,32 @@ class MCPClientBase:
         self.model = model
         self.stream = stream
         self.session: ClientSession = None
-        self.messages = []
+        # 对话历史按Token预算压缩, messages 与 history.messages 为同一列表
+        self.history = HistoryManager()
+        self.messages = self.history.messages
         self.tool_calls: dict[str, dict] = {}
+        # 按服务商格式转换后的工具列表, 收到 tools/list_changed 或重新连接时失效
+        self.prepared_tools: list = None
+        self.tools_version = 0
+        # 每个工具调用的参数增量扫描器: index -> (tool_call, scanner)
+        self.argument_scanners: dict[int, tuple[dict, JsonStreamScanner]] = {}
+        # 本轮参数已完整的工具调用(按模型输出顺序), 整轮结束后统一执行
+        self.ready_calls: list[dict] = []
+        # 工具名 -> 是否只读(readOnlyHint), 与 prepared_tools 一同刷新
+        self.read_only_tools: dict[str, bool] = {}
         self.should_clear_messages = False
         self.command_processing = False
         self.use_history = False
         self.models = []
         self.exit_stack = AsyncExitStack()
+        self.http_client: httpx.AsyncClient = None
         self.should_stop = False
         self.skip_current_command = False
-        self.command_queue = queue.Queue()
+        # 命令由主线程通过 submit_command 投递到客户端事件循环, 无需轮询
+        self.command_queue: asyncio.Queue[str | None] = asyncio.Queue()
         self.image_queue = queue.Queue()
+        self.loop: asyncio.AbstractEventLoop = None
+        self.loop_lock = Lock()
         self.is_running = False
         self.push_instance(self)
         # self.response_parser = ResponseParser()
@@ -91,35 +119,73 @@ class MCPClientBase:
     def base_url(self, value):
         self._base_url = value[:-1] if value.endswith("/") else value
 
-    def push_stream_message(self, message):
-        BTextWriter.get().push(deepcopy(message))
+    def push_stream_message(self, content: str):
+        # 连续的流式片段在日志中合并为一条记录
+        BTextWriter.get().push_stream(content)
 
     def push_message(self, message):
-        BTextWriter.get().push(deepcopy(message))
-        self.messages.append(message)
+        # 日志只保存显示文本, 无需复制消息
+        BTextWriter.get().push(message)
+        self.history.append(message)
 
     def clear_messages(self):
-        self.messages.clear()
+        self.history.clear()
         BTextWriter.get().clear()
 
     def update(self):
         if self.should_clear_messages:
             self.clear_messages()
             self.should_clear_messages = False
-        Timer.put(self.reset_config)
 
     def reset_config(self):
         from ..preference import get_pref
 
-        pref = get_pref()
-        self.base_url = pref.base_url
-        self.api_key = pref.api_key
-        self.model = pref.model
-        self.use_history = pref.use_history_message
+        self.apply_config(get_pref().dump_client_config())
+
+    def apply_config(self, config: dict):
+        self.base_url = config["base_url"]
+        self.api_key = config["api_key"]
+        self.model = config["model"]
+        self.use_history = config["use_history"]
+        self.history.budget = config["history_budget"]
+
+    def push_config(self, config: dict):
+        """
+        由偏好设置的更新回调(主线程)推送配置
+        """
+        self.call_in_loop(self.apply_config, config)
+
+    def submit_command(self, command: str):
+        """
+        由主线程投递命令, 立即唤醒客户端事件循环
+        """
+        self.call_in_loop(self.command_queue.put_nowait, command)
+
+    def call_in_loop(self, func, *args):
+        # 检查与直接执行都在锁内: 避免检查之后事件循环才启动, 命令被投递到无人等待的时机
+        with self.loop_lock:
+            loop = self.loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(func, *args)
+                return
+            # 事件循环尚未启动或已结束, 直接执行(启动前放入队列的命令会在启动后被取出)
+            func(*args)
 
     def get_chat_url(self):
         return ""
 
+    def get_http_client(self) -> httpx.AsyncClient:
+        """
+        每个服务商客户端复用一个连接池(keep-alive), 避免每次请求重新建立TLS连接; 安装了h2时启用HTTP/2
+        """
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(
+                http2=find_spec("h2") is not None,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=120),
+            )
+        return self.http_client
+
     def fetch_models(self, force=False) -> list:
         if self.models and not force:
             return self.models
@@ -178,6 +244,8 @@ class MCPClientBase:
         if not (instance := cls.pop_instance()):
             return
         instance.should_stop = True
+        # 唤醒等待命令的事件循环
+        instance.call_in_loop(instance.command_queue.put_nowait, None)
 
     @classmethod
     def try_start_client(cls):
@@ -226,20 +294,76 @@ class MCPClientBase:
 
     async def connect_to_server(self):
         """连接到MCP服务器"""
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        stdio_transport = await self.exit_stack.enter_async_context(sse_client(url="http://localhost:45677/sse", headers=headers))
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
+        self.invalidate_tools()
+        if self.transport == "memory" and (server := self.get_local_server()):
+            # 内存流连接: 工具调用不经过HTTP序列化与uvicorn, session已完成initialize
+            session = create_connected_server_and_client_session(server, message_handler=self.handle_message, client_info=self.client_info())
+            self.session = await self.exit_stack.enter_async_context(session)
+            return
+        await self.connect_to_http_server()
+
+    async def connect_to_http_server(self):
+        from ..server.server import Server
+
+        url = Server.get_url()
+        if Server.transport == "streamable-http":
+            # streamable-http 需要同时接受 json 与 event-stream, 使用默认请求头
+            self.stdio, self.write, _ = await self.exit_stack.enter_async_context(streamablehttp_client(url=url))
+        else:
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+            self.stdio, self.write = await self.exit_stack.enter_async_context(sse_client(url=url, headers=headers))
+        session = ClientSession(self.stdio, self.write, message_handler=self.handle_message, client_info=self.client_info())
+        self.session = await self.exit_stack.enter_async_context(session)
 
         await self.session.initialize()
 
-    def parse_line(self, line: str) -> dict:
+    def client_info(self) -> Implementation:
+        # 服务器按 clientInfo.name 为内置客户端分配调度权重
+        return Implementation(name=BUILTIN_CLIENT_NAME, version=self.info()["version"])
+
+    async def handle_message(self, message):
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            logger.info("工具列表已变化")
+            self.invalidate_tools()
+
+    def invalidate_tools(self):
+        self.prepared_tools = None
+        self.tools_version += 1
+
+    async def prepare_tools(self) -> list:
+        """
+        获取服务商格式的工具列表, 缓存到工具列表变化或重新连接为止
+        """
+        if self.prepared_tools is not None:
+            return self.prepared_tools
+        version = self.tools_version
+        response = await self.session.list_tools()
+        self.read_only_tools = {tool.name: bool(tool.annotations and tool.annotations.readOnlyHint) for tool in response.tools}
+        tools = self.convert_tools(response.tools)
+        # 获取期间工具列表发生变化时不缓存
+        if version == self.tools_version:
+            self.prepared_tools = tools
+        return tools
+
+    def convert_tools(self, tools: list) -> list:
+        return tools
+
+    def get_local_server(self):
+        from ..server.server import Server
+
+        if not Server.server:
+            return None
+        return Server.server._mcp_server
+
+    def parse_line(self, line: str | bytes) -> dict:
         if not line:
             return {}
-        line = line.decode("utf-8").replace("data:", "").strip()
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.replace("data:", "").strip()
         # print("收到消息:", line)
         if line.endswith(("[DONE]", "PROCESSING")):
             return {}
@@ -278,36 +402,120 @@ class MCPClientBase:
     def ensure_tool_call(self, index: int):
         tool_call = self.tool_calls[index]
         func = tool_call.get("function", {})
+        arguments = func.get("arguments", "")
+        cached = self.argument_scanners.get(index)
+        if not cached or cached[0] is not tool_call:
+            cached = self.argument_scanners[index] = (tool_call, JsonStreamScanner())
+        scanner = cached[1]
+        # 只扫描新增的参数片段, 结构完整后才完整解析一次; 结构不合法时回退到每次完整解析
+        if not scanner.feed(arguments[scanner.consumed :]) and not scanner.error:
+            return False
         try:
-            arguments = func.get("arguments", "").strip()
-            self.parse_arguments(arguments)
+            self.parse_arguments(arguments.strip())
         except Exception:
             return False
         return True
 
-    async def call_tool(self, index: int):
-        """调用工具"""
-        tool_call = self.tool_calls[index]
-        func = tool_call.get("function", {})
-        fn_name = func.get("name")
-        arguments = func.get("arguments", "").strip() or "{}"
+    def finish_tool_call(self, index: int):
+        """
+        参数已完整的工具调用移入 ready_calls, 之后同一index的多余arguments(小模型生成)会被忽略
+        """
+        tool_call = self.tool_calls.pop(index)
+        self.argument_scanners.pop(index, None)
+        self.ready_calls.append(tool_call)
+
+    def group_tool_calls(self, tool_calls: list[dict]) -> list[tuple[bool, list[int]]]:
+        """
+        按原顺序把工具调用分为连续的 只读/修改 分组, 返回 [(是否只读, [序号...]), ...]
+            分组之间按顺序执行, 保证修改后的读取能看到修改结果
+        """
+        groups = []
+        for i, tool_call in enumerate(tool_calls):
+            read_only = self.read_only_tools.get(tool_call["function"].get("name"), False)
+            if groups and groups[-1][0] == read_only:
+                groups[-1][1].append(i)
+            else:
+                groups.append((read_only, [i]))
+        return groups
+
+    async def call_tools(self, tool_calls: list[dict], content: str = ""):
+        """
+        执行一轮中的全部工具调用, 结果按原顺序写入messages
+            连续的只读工具并发执行, 连续的修改类工具合并为一次 batch_execute 调用(主线程只切换一次)
+            content: 本轮工具调用之前模型输出的文本(已流式显示, 只写入历史)
+        """
+        if not tool_calls:
+            return
         print()  # 每次调用工具时，打印一个空行，方便查看日志
-        logger.info(f"尝试工具: {fn_name} 参数: {arguments}")
-        results = await self.call_tool_ex(fn_name, arguments)
-        self.tool_calls.pop(index)
-        self.push_message({"role": "assistant", "content": "", "tool_calls": [tool_call]})
-        for rtype, result in results:
-            final_result = f"Selected tool: {fn_name}\nResult: {result}"
-            tool_call_result = {"role": "tool", "content": final_result, "tool_call_id": tool_call["id"], "name": fn_name}
-            self.push_message(tool_call_result)
+        results: list[list[tuple[str, str]]] = [[] for _ in tool_calls]
+        for read_only, indices in self.group_tool_calls(tool_calls):
+            if self.should_skip():
+                break
+            calls = [tool_calls[i]["function"] for i in indices]
+            for call in calls:
+                logger.info(f"尝试工具: {call.get('name')} 参数: {call.get('arguments', '').strip() or '{}'}")
+            if read_only:
+                group_results = await asyncio.gather(*(self.call_tool_ex(call.get("name"), call.get("arguments", "").strip() or "{}") for call in calls))
+            elif len(calls) > 1 and self.batch_tool in self.read_only_tools and all(call.get("name") != self.batch_tool for call in calls):
+                # batch_execute 只能执行主线程工具, 不能嵌套自身; 每个调用的参数在服务端按工具的参数模型校验/转换, 与单独调用一致
+                group_results = await self.call_tools_batch(calls)
+            else:
+                group_results = [await self.call_tool_ex(call.get("name"), call.get("arguments", "").strip() or "{}") for call in calls]
+            for i, call_results in zip(indices, group_results):
+                results[i] = call_results
+        self.history.append({"role": "assistant", "content": content, "tool_calls": list(tool_calls)})
+        for tool_call, call_results in zip(tool_calls, results):
+            fn_name = tool_call["function"].get("name")
+            if not call_results:
+                call_results = [("error", "Skipped")]
+            for rtype, result in call_results:
+                final_result = f"Selected tool: {fn_name}\nResult: {result}"
+                tool_call_result = {"role": "tool", "content": final_result, "tool_call_id": tool_call["id"], "name": fn_name}
+                self.push_message(tool_call_result)
+
+    async def call_tools_batch(self, calls: list[dict]) -> list[list[tuple[str, str]]]:
+        """
+        多个修改类工具合并为一次 batch_execute 调用, 再按顺序拆分为每个调用的结果
+        """
+        results: list[list[tuple[str, str]]] = [[] for _ in calls]
+        batch, positions = [], []
+        for i, call in enumerate(calls):
+            try:
+                arguments = self.parse_arguments(call.get("arguments", "").strip() or "{}")
+            except Exception as e:
+                results[i] = [("error", f"Argument parsing error: {e}")]
+                continue
+            batch.append({"tool": call.get("name"), "arguments": arguments})
+            positions.append(i)
+        if not batch:
+            return results
+        batch_results = await self.call_tool_ex(self.batch_tool, {"calls": batch, "stop_on_error": False})
+        entries = []
+        if len(batch_results) == 1 and batch_results[0][0] == "text":
+            try:
+                entries = json.loads(batch_results[0][1]).get("results", [])
+            except Exception:
+                entries = []
+        if len(entries) != len(batch):
+            # 批量调用失败, 或结果过大被分页(无法拆分): 整体结果写入第一个调用
+            for n, i in enumerate(positions):
+                results[i] = batch_results if n == 0 or batch_results[0][0] == "error" else [("text", "See the result of the first call in this batch")]
+            return results
+        for i, entry in zip(positions, entries):
+            if entry.get("status") == "success":
+                results[i] = [("text", json.dumps(entry.get("result"), ensure_ascii=False, separators=(",", ":")))]
+            else:
+                results[i] = [("error", f"Error: {entry.get('message', 'Unknown error')}")]
+        return results
 
     async def call_tool_ex(self, fn_name: str, arguments: str | dict) -> tuple[str, str]:
         try:
-            arguments = self.parse_arguments(arguments)
+            if isinstance(arguments, str):
+                arguments = self.parse_arguments(arguments)
         except Exception as e:
             logger.info(f"参数解析错误:\n{arguments}\n{e}")
             return [("error", f"Argument parsing error: {e}")]
-        res = await self.session.call_tool(fn_name, arguments)
+        res = await self.session.call_tool(fn_name, arguments, progress_callback=self.on_tool_progress)
         results = []
         for res_content in res.content:
             result = ""
@@ -324,26 +532,29 @@ class MCPClientBase:
             results.append((rtype, result))
         return results
 
+    async def on_tool_progress(self, progress: float, total: float | None, message: str | None):
+        percent = f" {progress / total:.0%}" if total else f" {progress:.0f}"
+        print(f"\r{message or 'Progress'}:{percent}", end="", flush=True)
+
     async def process_query(self, query: str) -> str:
         """Process a query using Claude and available tools"""
         return ""
 
     async def main(self):
+        with self.loop_lock:
+            self.loop = asyncio.get_running_loop()
         try:
             logger.info("尝试连接到创世核心...")
             await self.connect_to_server()
             logger.info("创世核心已连接!")
-            while True:
+            while not self.should_stop:
                 try:
                     self.command_processing = False
-                    self.update()
-                    if self.should_stop:
+                    query = await self.command_queue.get()
+                    # None 为停止客户端时的唤醒信号
+                    if query is None or self.should_stop:
                         break
-                    try:
-                        query = self.command_queue.get_nowait()
-                    except queue.Empty:
-                        await asyncio.sleep(0.2)
-                        continue
+                    self.update()
                     logger.info(f"当前命令: {query}")
                     self.skip_current_command = False
                     self.command_processing = True
@@ -355,7 +566,7 @@ class MCPClientBase:
                     logger.info(f"处理完成: {query}")
                     # client.session.call_tool
                     # print(response)
-                except requests.exceptions.HTTPError as e:
+                except (requests.exceptions.HTTPError, httpx.HTTPStatusError) as e:
                     logger.warning(f"HTTP错误(请检查api_key, 模型使用情况或额度): {e}")
                 except Exception:
                     import traceback
@@ -370,4 +581,8 @@ class MCPClientBase:
     async def cleanup(self):
         """清理资源"""
         self.command_processing = False
+        with self.loop_lock:
+            self.loop = None
+        if self.http_client:
+            await self.http_client.aclose()
         await self.exit_stack.aclose()
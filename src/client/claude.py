@@ -1,9 +1,26 @@
+import json
+import time
+import base64
+import httpx
 import requests
+from pathlib import Path
 
-from .openai import MCPClientOpenAI, logger
+from .base import MCPClientBase, logger
+from .tool_spec import ToolSpecCache
 
 
-class MCPClientClaude(MCPClientOpenAI):
+class MCPClientClaude(MCPClientBase):
+    """
+    Anthropic Messages API 原生客户端(/v1/messages)
+        工具描述, system 以及历史消息的末尾标记 cache_control, 连续请求时命中提示词缓存, 降低首Token延迟和费用
+        历史消息仍以OpenAI格式保存(与 HistoryManager / call_tools 共用), 请求时转换为 Messages API 格式
+        工具参数通过 input_json_delta 流式输出, content_block_stop 时即为完整参数
+    """
+
+    anthropic_version = "2023-06-01"
+    max_tokens = 4096
+    cache_control = {"type": "ephemeral"}
+
     @classmethod
     def info(cls):
         return {
@@ -22,17 +39,24 @@ class MCPClientClaude(MCPClientOpenAI):
 
     def __init__(self, base_url="https://api.anthropic.com", api_key="", model="", stream=True):
         super().__init__(base_url, api_key, model, stream)
+        # 本次会话累计Token用量(含缓存读取/写入)
+        self.usage = {"input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0, "output_tokens": 0}
 
     def get_chat_url(self):
-        return f"{self.base_url}/v1/chat/completions"
+        return f"{self.base_url}/v1/messages"
 
-    def fetch_models_ex(self):
+    def get_headers(self) -> dict:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "anthropic-version": "2023-06-01",
-            "x-api-key": self.api_key,
+            "anthropic-version": self.anthropic_version,
         }
+        if self.api_key:
+            headers["x-api-key"] = self.api_key
+        return headers
+
+    def fetch_models_ex(self):
+        headers = self.get_headers()
 
         model_url = f"{self.base_url}/v1/models"
         if not self.api_key:
@@ -50,3 +74,197 @@ class MCPClientClaude(MCPClientOpenAI):
         except Exception as e:
             logger.error(f"获取模型列表失败, 请检查大模型服务商, API密钥及base url是否正确: {e}")
         return self.models
+
+    def convert_tools(self, tools: list) -> list:
+        # 复用OpenAI格式缓存中简化后的描述, 最后一个工具标记缓存断点(缓存全部工具描述)
+        specs = []
+        for tool in tools:
+            function = ToolSpecCache.get_openai_spec(tool.name, tool.description, tool.inputSchema)["function"]
+            specs.append({"name": function["name"], "description": function["description"], "input_schema": function["parameters"]})
+        if specs:
+            specs[-1] = {**specs[-1], "cache_control": self.cache_control}
+        return specs
+
+    def convert_content(self, content) -> list:
+        if isinstance(content, str):
+            return [{"type": "text", "text": content}] if content else []
+        blocks = []
+        for part in content or []:
+            ptype = part.get("type")
+            if ptype == "image_url":
+                # data:image/jpeg;base64,XXX
+                header, _, data = part["image_url"]["url"].partition(",")
+                media_type = header.removeprefix("data:").split(";")[0] or "image/jpeg"
+                blocks.append({"type": "image", "source": {"type": "base64", "media_type": media_type, "data": data}})
+            elif ptype == "text" and not part.get("text"):
+                continue
+            else:
+                blocks.append(part)
+        return blocks
+
+    def convert_arguments(self, arguments: str) -> dict:
+        try:
+            arguments = self.parse_arguments(arguments.strip() or "{}")
+        except Exception:
+            return {}
+        return arguments if isinstance(arguments, dict) else {}
+
+    def convert_messages(self, messages: list[dict]) -> list[dict]:
+        """
+        OpenAI格式历史 -> Messages API格式
+            assistant.tool_calls -> tool_use, 连续的 tool 消息 -> 一条 user 消息中的 tool_result
+            相同角色的连续消息合并(Messages API 要求 user/assistant 交替)
+        """
+        converted = []
+        for message in messages:
+            role = message.get("role")
+            if role == "tool":
+                role = "user"
+                tool_use_id = message.get("tool_call_id")
+                content = message.get("content") or ""
+                last = converted[-1]["content"][-1] if converted and converted[-1]["role"] == role else None
+                if last and last.get("type") == "tool_result" and last.get("tool_use_id") == tool_use_id:
+                    # 同一工具调用返回多个内容时合并到一个 tool_result (tool_use_id 不能重复)
+                    if isinstance(last["content"], str):
+                        last["content"] = [{"type": "text", "text": last["content"]}] if last["content"] else []
+                    if content:
+                        last["content"].append({"type": "text", "text": content})
+                    continue
+                blocks = [{"type": "tool_result", "tool_use_id": tool_use_id, "content": content}]
+            elif role == "assistant":
+                blocks = self.convert_content(message.get("content"))
+                for tool_call in message.get("tool_calls") or []:
+                    function = tool_call.get("function", {})
+                    blocks.append({"type": "tool_use", "id": tool_call["id"], "name": function.get("name"), "input": self.convert_arguments(function.get("arguments", ""))})
+            else:
+                role = "user"
+                blocks = self.convert_content(message.get("content"))
+            if not blocks:
+                continue
+            if converted and converted[-1]["role"] == role:
+                converted[-1]["content"].extend(blocks)
+            else:
+                converted.append({"role": role, "content": blocks})
+        return converted
+
+    def mark_cache_breakpoint(self, messages: list[dict]):
+        # 最后一个内容块标记缓存断点, 下次请求(工具调用后的继续或下一条命令)复用整个前缀
+        if not messages or not messages[-1]["content"]:
+            return
+        content = messages[-1]["content"]
+        content[-1] = {**content[-1], "cache_control": self.cache_control}
+
+    def response_raise_status(self, response: httpx.Response):
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            try:
+                json_data = response.json()
+                if message := self.parse_error(json_data):
+                    raise Exception(message)
+                print(json_data)
+            except json.JSONDecodeError:
+                ...
+            raise
+
+    def record_usage(self, usage: dict, ttft: float):
+        for key in self.usage:
+            self.usage[key] += usage.get(key) or 0
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        total_input = cache_read + cache_write + (usage.get("input_tokens") or 0)
+        hit_rate = cache_read / total_input if total_input else 0
+        logger.info(
+            f"Token用量: 输入 {total_input} (缓存命中 {cache_read}, 缓存写入 {cache_write}, 命中率 {hit_rate:.0%}) 输出 {usage.get('output_tokens') or 0} 首Token {ttft * 1000:.0f} ms"
+        )
+
+    async def process_query(self, query: str) -> list:
+        headers = self.get_headers()
+        data = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "system": [{"type": "text", "text": self.system_prompt(), "cache_control": self.cache_control}],
+            "messages": [],
+            "tools": None,
+            "stream": True,
+        }
+        if not self.use_history:
+            self.clear_messages()
+        user_content = [{"type": "text", "text": query}]
+        while not self.image_queue.empty():
+            image_path = Path(self.image_queue.get())
+            base64_image = base64.b64encode(image_path.read_bytes()).decode()
+            user_content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}})
+
+        self.push_message({"role": "user", "content": user_content})
+        data["tools"] = await self.prepare_tools()
+        client = self.get_http_client()
+        while not self.should_skip():
+            messages = self.convert_messages(self.history.payload())
+            self.mark_cache_breakpoint(messages)
+            data["messages"] = messages
+            self.tool_calls.clear()
+            self.argument_scanners.clear()
+            self.ready_calls.clear()
+            usage = {}
+            # 本次回复的文本, 与工具调用一起写入历史, 保证下次请求的前缀与模型实际输出一致
+            text_parts: list[str] = []
+            start = time.perf_counter()
+            ttft = 0
+            async with client.stream("POST", self.get_chat_url(), json=data, headers=headers) as response:
+                if response.is_error:
+                    await response.aread()
+                    self.response_raise_status(response)
+
+                async for line in response.aiter_lines():
+                    # 事件类型同时在 data 中给出, 忽略 event: 行
+                    if not line.startswith("data:"):
+                        continue
+                    if self.should_skip():
+                        break
+                    if not (event := self.parse_line(line)):
+                        continue
+                    etype = event.get("type")
+                    if etype == "message_start":
+                        usage.update(event.get("message", {}).get("usage", {}))
+                    elif etype == "message_delta":
+                        usage.update(event.get("usage", {}))
+                    elif etype == "error":
+                        logger.error(self.parse_error(event))
+                        break
+                    elif etype == "content_block_start":
+                        block = event.get("content_block", {})
+                        if block.get("type") == "tool_use":
+                            # 与OpenAI格式的工具调用保持一致, 复用 call_tools
+                            self.tool_calls[event["index"]] = {"id": block["id"], "type": "function", "function": {"name": block["name"], "arguments": ""}}
+                            print(f"\n选择工具: {block['name']} 参数: ", end="", flush=True)
+                    elif etype == "content_block_delta":
+                        ttft = ttft or time.perf_counter() - start
+                        delta = event.get("delta", {})
+                        if (content := delta.get("text")) or (content := delta.get("thinking")):
+                            if "text" in delta:
+                                text_parts.append(content)
+                            self.push_stream_message(content)
+                            print(content, end="", flush=True)
+                        elif (arguments := delta.get("partial_json")) and event.get("index") in self.tool_calls:
+                            self.tool_calls[event["index"]]["function"]["arguments"] += arguments
+                            print(arguments, end="", flush=True)
+                    elif etype == "content_block_stop":
+                        # 工具参数在块结束时完整
+                        if event.get("index") in self.tool_calls:
+                            self.finish_tool_call(event["index"])
+            if usage:
+                self.record_usage(usage, ttft)
+            if self.should_skip():
+                break
+            # 流被中断时未结束的工具调用也执行一次, 报错信息会写入messages
+            for index in list(self.tool_calls):
+                self.finish_tool_call(index)
+            text = "".join(text_parts)
+            if not self.ready_calls:
+                if text:
+                    # 已流式显示, 只写入历史
+                    self.history.append({"role": "assistant", "content": text})
+                break
+            await self.call_tools(self.ready_calls, text)
+        return ""
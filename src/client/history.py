@@ -0,0 +1,172 @@
+import json
+
+from ..logger import getLogger
+
+logger = getLogger("  BlenderClient")
+
+
+class HistoryManager:
+    """
+    按Token预算压缩对话历史, 保证每次请求发送的消息总量有上限
+        Token按字符数粗略估算(ASCII约4字符/Token, 其余按UTF-8字节数/3), 每条消息的估算结果缓存
+        超出预算时依次:
+            1. 将较早轮次(最近 keep_turns 轮之外)的工具结果折叠为摘要, 移除其中的图片
+            2. 折叠最近轮次中模型已看过的工具结果(最后一步的结果保留)
+            3. 丢弃最早的完整轮次(以用户消息为界, 保证工具调用与结果成对), 被丢弃轮次的请求汇总为一条摘要消息
+        最新一轮始终保留
+    """
+
+    message_overhead = 4
+    image_tokens = 1000
+    summary_chars = 240
+    keep_turns = 2
+    max_summary_requests = 10
+    image_placeholder = "[image omitted]"
+
+    def __init__(self, budget: int = 16000):
+        self.budget = budget
+        self.messages: list[dict] = []
+        self.tokens: list[int] = []
+        # 被丢弃轮次的用户请求(用于生成摘要消息)
+        self.dropped_requests: list[str] = []
+        self.dropped_turns = 0
+
+    def append(self, message: dict):
+        self.messages.append(message)
+        if len(self.tokens) == len(self.messages) - 1:
+            self.tokens.append(self.estimate(message))
+
+    def clear(self):
+        self.messages.clear()
+        self.tokens.clear()
+        self.dropped_requests.clear()
+        self.dropped_turns = 0
+
+    @classmethod
+    def estimate_text(cls, text: str) -> int:
+        if text.isascii():
+            return len(text) // 4 + 1
+        return len(text.encode("utf-8")) // 3 + 1
+
+    @classmethod
+    def estimate(cls, message: dict) -> int:
+        tokens = cls.message_overhead
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += cls.estimate_text(content)
+        elif isinstance(content, list):
+            for part in content:
+                ptype = part.get("type")
+                if ptype == "text":
+                    tokens += cls.estimate_text(part.get("text", ""))
+                elif ptype in {"image_url", "image"}:
+                    tokens += cls.image_tokens
+                else:
+                    tokens += cls.estimate_text(json.dumps(part, ensure_ascii=False))
+        if tool_calls := message.get("tool_calls"):
+            tokens += cls.estimate_text(json.dumps(tool_calls, ensure_ascii=False))
+        return tokens
+
+    def total_tokens(self) -> int:
+        self.sync_tokens()
+        return sum(self.tokens)
+
+    def sync_tokens(self):
+        # 消息列表被外部直接修改时重新估算
+        if len(self.tokens) != len(self.messages):
+            self.tokens = [self.estimate(message) for message in self.messages]
+
+    def turn_starts(self) -> list[int]:
+        return [i for i, message in enumerate(self.messages) if message.get("role") == "user"]
+
+    def is_tool_result(self, message: dict) -> bool:
+        return message.get("role") == "tool"
+
+    def collapse_text(self, text: str) -> str:
+        if len(text) <= self.summary_chars:
+            return text
+        return f"{text[: self.summary_chars]}... [truncated {len(text) - self.summary_chars} chars from an earlier tool result]"
+
+    def collapse(self, index: int) -> bool:
+        """
+        折叠单条消息: 工具结果截断为摘要, 用户消息中的图片替换为占位文本, 返回是否有变化
+        """
+        message = self.messages[index]
+        content = message.get("content")
+        if self.is_tool_result(message) and isinstance(content, str):
+            collapsed = self.collapse_text(content)
+            if collapsed == content:
+                return False
+            message["content"] = collapsed
+        elif isinstance(content, list) and any(part.get("type") in {"image_url", "image"} for part in content):
+            message["content"] = [part if part.get("type") not in {"image_url", "image"} else {"type": "text", "text": self.image_placeholder} for part in content]
+        else:
+            return False
+        self.tokens[index] = self.estimate(message)
+        return True
+
+    def last_step_start(self) -> int:
+        # 最后一步的工具结果(模型尚未看到)从最后一条非工具结果消息之后开始
+        for i in range(len(self.messages) - 1, -1, -1):
+            if not self.is_tool_result(self.messages[i]):
+                return i + 1
+        return 0
+
+    def request_text(self, message: dict) -> str:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if part.get("type") == "text" and part.get("text") != self.image_placeholder)
+        text = " ".join(str(content or "").split())
+        return text[:100] + ("..." if len(text) > 100 else "")
+
+    def make_summary(self) -> dict:
+        requests = "\n".join(f"- {text}" for text in self.dropped_requests[-self.max_summary_requests :])
+        content = f"[Earlier conversation compacted: {self.dropped_turns} turns removed. Most recent earlier requests:]\n{requests}"
+        return {"role": "user", "content": content, "summary": True}
+
+    def drop_oldest_turn(self) -> bool:
+        starts = [i for i in self.turn_starts() if not self.messages[i].get("summary")]
+        if len(starts) < 2:
+            return False
+        begin, end = starts[0], starts[1]
+        self.dropped_requests.append(self.request_text(self.messages[begin]))
+        self.dropped_requests = self.dropped_requests[-self.max_summary_requests :]
+        self.dropped_turns += 1
+        del self.messages[begin:end]
+        del self.tokens[begin:end]
+        summary = self.make_summary()
+        if self.messages and self.messages[0].get("summary"):
+            self.messages[0] = summary
+            self.tokens[0] = self.estimate(summary)
+        else:
+            self.messages.insert(0, summary)
+            self.tokens.insert(0, self.estimate(summary))
+        return True
+
+    def compact(self) -> list[dict]:
+        """
+        压缩到预算以内(尽量), 原地修改并返回消息列表
+        """
+        self.sync_tokens()
+        before = total = sum(self.tokens)
+        if total <= self.budget:
+            return self.messages
+        starts = self.turn_starts()
+        protected = starts[-self.keep_turns] if len(starts) >= self.keep_turns else 0
+        for limit in (protected, self.last_step_start()):
+            for i in range(limit):
+                if total <= self.budget:
+                    break
+                old = self.tokens[i]
+                if self.collapse(i):
+                    total += self.tokens[i] - old
+        while total > self.budget and self.drop_oldest_turn():
+            total = sum(self.tokens)
+        logger.info(f"历史消息已压缩: {before} -> {total} tokens (预算 {self.budget})")
+        return self.messages
+
+    def payload(self) -> list[dict]:
+        """
+        压缩后发送给大模型的消息(去掉内部标记字段)
+        """
+        return [{k: v for k, v in message.items() if k != "summary"} if message.get("summary") else message for message in self.compact()]
@@ -0,0 +1,80 @@
+import re
+
+
+class JsonStreamScanner:
+    """
+    增量JSON结构扫描: 流式拼接工具调用参数时, 只扫描新增片段, 判断参数是否已构成完整的JSON对象
+        只跟踪括号嵌套与字符串/转义状态, 不做完整解析(完整解析在 complete 后执行一次)
+        字符串内部通过正则跳到下一个引号或反斜杠, 每个片段的扫描成本与片段长度成正比
+        error: 结构不合法(非对象开头, 括号不匹配, 对象结束后还有内容等), 此时调用方应回退到完整解析
+    """
+
+    STRUCT_PATTERN = re.compile(r'[{}\[\]"]')
+    STRING_PATTERN = re.compile(r'["\\]')
+    PAIRS = {"}": "{", "]": "["}
+
+    __slots__ = ("consumed", "stack", "in_string", "escape", "started", "complete", "error")
+
+    def __init__(self):
+        self.consumed = 0
+        self.stack: list[str] = []
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.complete = False
+        self.error = False
+
+    def feed(self, fragment: str) -> bool:
+        """
+        输入新增片段, 返回当前是否为完整的JSON对象
+        """
+        self.consumed += len(fragment)
+        if self.error:
+            return False
+        pos, end = 0, len(fragment)
+        if self.escape and end:
+            # 上一个片段以反斜杠结尾, 跳过被转义的字符
+            self.escape = False
+            pos = 1
+        while pos < end:
+            if self.in_string:
+                match = self.STRING_PATTERN.search(fragment, pos)
+                if not match:
+                    break
+                if match.group() == "\\":
+                    if match.end() >= end:
+                        self.escape = True
+                        break
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                continue
+            match = self.STRUCT_PATTERN.search(fragment, pos)
+            stop = match.start() if match else end
+            # 对象之外(开头之前/结束之后)只允许空白
+            if not self.stack and fragment[pos:stop].strip():
+                return self.fail()
+            if not match:
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                if not self.stack:
+                    return self.fail()
+                self.in_string = True
+            elif char in "{[":
+                if not self.stack and (self.started or char == "["):
+                    return self.fail()
+                self.stack.append(char)
+                self.started = True
+            else:
+                if not self.stack or self.stack.pop() != self.PAIRS[char]:
+                    return self.fail()
+        self.complete = self.started and not self.stack and not self.in_string
+        return self.complete
+
+    def fail(self) -> bool:
+        self.error = True
+        self.complete = False
+        return False
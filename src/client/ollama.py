@@ -1,5 +1,5 @@
 import bpy
-import requests
+import httpx
 import json
 from copy import deepcopy
 from .openai import MCPClientOpenAI, logger
@@ -25,10 +25,10 @@ class MCPClientLocalOllama(MCPClientOpenAI):
     def __init__(self, base_url="http://localhost:11434", api_key="ollama", model="", stream=True):
         super().__init__(base_url, api_key=api_key, model=model, stream=stream)
 
-    def response_raise_status(self, response: requests.Response):
+    def response_raise_status(self, response: httpx.Response):
         try:
             response.raise_for_status()
-        except requests.exceptions.HTTPError:
+        except httpx.HTTPStatusError:
             try:
                 json_data = response.json()
                 error = json_data.get("error", "")
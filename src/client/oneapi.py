@@ -1,5 +1,5 @@
 import json
-import requests
+import httpx
 from .openai import MCPClientOpenAI, logger
 
 
@@ -26,7 +26,7 @@ class MCPClientOneAPI(MCPClientOpenAI):
     def response_raise_status(self, response):
         try:
             response.raise_for_status()
-        except requests.exceptions.HTTPError:
+        except httpx.HTTPStatusError:
             try:
                 json_data = response.json()
                 if message := json_data.get("message"):
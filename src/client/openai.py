@@ -1,12 +1,12 @@
 import json
 import bpy
 import base64
+import httpx
 import requests
-import re
-from copy import deepcopy
 from pathlib import Path
 
 from .base import MCPClientBase, logger
+from .tool_spec import ToolSpecCache
 
 
 class MCPClientOpenAI(MCPClientBase):
@@ -48,49 +48,14 @@ class MCPClientOpenAI(MCPClientBase):
             logger.error("获取模型列表失败, 请检查大模型服务商, API密钥及base url是否正确")
         return self.models
 
-    async def prepare_tools(self):
-        response = await self.session.list_tools()
-        tools = []
-        for tool in response.tools:
-            tool_info = {
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    # "parameters": {
-                    #     "type": "object",
-                    #     "properties": {
-                    #         "city": {
-                    #             "type": "string",
-                    #             "description": "The name of the city",
-                    #         },
-                    #     },
-                    #     "required": ["city"],
-                    # },
-                },
-            }
-            parameters = deepcopy(tool.inputSchema)
-            tool_info["function"]["parameters"] = parameters
-            # region 简化函数描述
-            description = tool.description
-            description = description.replace("Args:", "")
-            for name, info in parameters.get("properties", {}).items():
-                find_description = re.search(f"- {name}: (.*)\n", description)
-                if not find_description:
-                    continue
-                description = description.replace(find_description.group(0), "")
-            description = description.replace("\n", "").strip()
-            while "  " in description:
-                description = description.replace("  ", " ")
-            # endregion 简化函数描述
-            tool_info["function"]["description"] = description
-            tools.append(tool_info)
-        return tools
+    def convert_tools(self, tools: list) -> list:
+        # 从缓存获取OpenAI格式的工具描述(简化后的函数描述)
+        return [ToolSpecCache.get_openai_spec(tool.name, tool.description, tool.inputSchema) for tool in tools]
 
-    def response_raise_status(self, response: requests.Response):
+    def response_raise_status(self, response: httpx.Response):
         try:
             response.raise_for_status()
-        except requests.exceptions.HTTPError:
+        except httpx.HTTPStatusError:
             try:
                 json_data = response.json()
                 error = json_data.get("error", {})
@@ -109,12 +74,14 @@ class MCPClientOpenAI(MCPClientBase):
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
         }
+        # 本地服务(如ollama)可能不需要api_key, 空的Authorization头会被httpx拒绝
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
 
         data = {
             "model": self.model,
-            "messages": self.messages,
+            "messages": [],
             "tools": None,
             "stream": self.stream,
         }
@@ -135,18 +102,21 @@ class MCPClientOpenAI(MCPClientBase):
 
         self.push_message({"role": "user", "content": user_content})
         data["tools"] = await self.prepare_tools()
-        with requests.Session() as session:
-            session.headers.update(headers)
-            session.stream = self.stream
-            while not self.should_skip():
-                last_call_index = -1
-                self.tool_calls.clear()
-                response = session.post(self.get_chat_url(), json=data)
-                self.response_raise_status(response)
-                response.encoding = "utf-8"
+        client = self.get_http_client()
+        while not self.should_skip():
+            # 每次请求前按Token预算压缩历史
+            data["messages"] = self.history.payload()
+            last_call_index = -1
+            self.tool_calls.clear()
+            self.argument_scanners.clear()
+            self.ready_calls.clear()
+            async with client.stream("POST", self.get_chat_url(), json=data, headers=headers) as response:
+                if response.is_error:
+                    await response.aread()
+                    self.response_raise_status(response)
                 # print("---------------------------------------START---------------------------------------")
 
-                for line in response.iter_lines():
+                async for line in response.aiter_lines():
                     if not line:
                         continue
                     if self.should_skip():
@@ -173,7 +143,7 @@ class MCPClientOpenAI(MCPClientBase):
                     # ---------------------------1.文本输出---------------------------
                     # 原始数据 {"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]}
                     if (content := delta.get("content")) or (content := delta.get("reasoning_content")):
-                        self.push_stream_message({"role": "streaming", "content": content})
+                        self.push_stream_message(content)
                         print(content, end="", flush=True)
 
                     # ---------------------------2.工具调用---------------------------
@@ -194,16 +164,16 @@ class MCPClientOpenAI(MCPClientBase):
                     if arguments := tool_call.get("function", {}).get("arguments", ""):
                         self.tool_calls[index]["function"]["arguments"] += arguments
                         print(arguments, end="", flush=True)
-                    # 每轮只允许一个工具调用( 当存在连续调用时, 每当tryjson 成功时就调用)
+                    # 参数完整后先收集, 整轮结束后统一执行(只读并发, 修改类合并为批量调用)
                     if self.ensure_tool_call(index):
-                        await self.call_tool(index)
-                # print("----------------------------------------END-----------------------------------------")
-                if self.should_skip():
-                    break
-                if last_call_index == -1:
-                    break
-                # 保证执行最后一个工具调用
-                for index in list(self.tool_calls):
-                    # 最后强制调用一次, 如果有报错信息会写入messages
-                    await self.call_tool(index)
+                        self.finish_tool_call(index)
+            # print("----------------------------------------END-----------------------------------------")
+            if self.should_skip():
+                break
+            if last_call_index == -1:
+                break
+            # 参数未能完整解析的调用也强制执行一次, 报错信息会写入messages
+            for index in list(self.tool_calls):
+                self.finish_tool_call(index)
+            await self.call_tools(self.ready_calls)
         return ""
@@ -0,0 +1,64 @@
+import re
+import json
+import hashlib
+from threading import Lock
+
+# - name: description.....
+PROPERTY_DESCRIPTION_PATTERN = re.compile(r"^\s*- (\w+): (.*)$", re.MULTILINE)
+
+
+def build_openai_tool_spec(name: str, description: str, parameters: dict) -> dict:
+    """
+    生成OpenAI格式的工具描述, 参数描述已在parameters中, 从函数描述中移除以简化
+    """
+    properties = parameters.get("properties", {})
+    description = (description or "").replace("Args:", "")
+    description = PROPERTY_DESCRIPTION_PATTERN.sub(lambda m: "" if m.group(1) in properties else m.group(0), description)
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": " ".join(description.split()),
+            "parameters": json.loads(json.dumps(parameters)),
+        },
+    }
+
+
+class ToolSpecCache:
+    """
+    MCP工具 -> OpenAI格式工具描述的内存缓存, 按工具内容hash索引
+        客户端 prepare_tools 直接使用, 服务端注册工具时预先生成并负责持久化(ToolSchemaCache)
+    """
+
+    specs: dict[str, dict] = {}
+    used: set[str] = set()
+    dirty = False
+    lock = Lock()
+
+    @staticmethod
+    def hash_key(name: str, description: str, parameters: dict) -> str:
+        return hashlib.sha1(json.dumps([name, description, parameters], sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def update(cls, specs: dict[str, dict]):
+        with cls.lock:
+            cls.specs.update(specs)
+
+    @classmethod
+    def dump(cls) -> dict[str, dict]:
+        # 只保留本次使用过的条目
+        with cls.lock:
+            cls.dirty = False
+            return {k: v for k, v in cls.specs.items() if k in cls.used}
+
+    @classmethod
+    def get_openai_spec(cls, name: str, description: str, parameters: dict) -> dict:
+        key = cls.hash_key(name, description, parameters)
+        cls.used.add(key)
+        if spec := cls.specs.get(key):
+            return spec
+        spec = build_openai_tool_spec(name, description, parameters)
+        with cls.lock:
+            cls.specs[key] = spec
+            cls.dirty = True
+        return spec
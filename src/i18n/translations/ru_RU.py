@@ -25,6 +25,10 @@ translations = (
     ("Modifier tools for blender.", "Инструменты для работы с модификаторами в Blender."),
     ("Use History Message", "Использовать историю сообщений (иначе история сообщений будет очищаться при каждом выполнении команды). Примечание: при включении значительно увеличивается потребление токенов", PROP_TCTX),
     ("API Settings", "Настройки API", PANEL_TCTX),
+    ("Server Settings", "Настройки сервера", PANEL_TCTX),
+    ("Transport", "Транспорт", PROP_TCTX),
+    ("History Token Budget", "Бюджет токенов истории", PROP_TCTX),
+    ("Approximate token limit of the history sent with each request, older tool results are collapsed and the oldest turns dropped beyond it", "Приблизительный лимит токенов истории, отправляемой с каждым запросом; при превышении старые результаты инструментов сворачиваются, а самые ранние ходы удаляются"),
     ("Genesis Core", "Genesis Core", PANEL_TCTX),
     ("Genesis Core", "Genesis Core"),
     ("Processing...", "Обработка..."),
@@ -25,6 +25,10 @@ translations = (
     ("Modifier tools for blender.", "Blender的修改器工具"),
     ("Use History Message", "启用历史消息(否则, 每次执行命令都会清空历史消息). 注意: 启用后Token消耗会显著增加", PROP_TCTX),
     ("API Settings", "API设置", PANEL_TCTX),
+    ("Server Settings", "服务器设置", PANEL_TCTX),
+    ("Transport", "传输方式", PROP_TCTX),
+    ("History Token Budget", "历史消息Token预算", PROP_TCTX),
+    ("Approximate token limit of the history sent with each request, older tool results are collapsed and the oldest turns dropped beyond it", "每次请求发送的历史消息的大致Token上限, 超出时折叠较早的工具结果并丢弃最早的对话轮次"),
     ("Genesis Core", "创世核心Alpha", PANEL_TCTX),
     ("Genesis Core", "创世核心"),
     ("Processing...", "处理中..."),
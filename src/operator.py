@@ -7,7 +7,8 @@ from threading import Thread
 from pathlib import Path
 from .client import MCPClientBase
 from .server.server import Server
-from .server.tools import ToolsPackageBase
+from .server.executor import BlenderExecutor
+from .server.sessions import BUILTIN_CLIENT_NAME
 from .i18n.translations.zh_HANS import OPS_TCTX
 from .logger import logger
 from .preference import get_pref
@@ -37,17 +38,8 @@ class RunCommand(bpy.types.Operator):
 
     def execute(self, context):
         pref = get_pref()
-        for tname in ToolsPackageBase.get_all_tool_packages_names():
-            tp = ToolsPackageBase.get_package(tname)
-            if not tp:
-                continue
-            tools = tp.get_all_tools()
-            if tname in pref.tools:
-                # 注册工具
-                Server.register_tools(tools)
-            else:
-                # 注销工具
-                Server.unregister_tools(tools)
+        # 只注册/注销启用状态变化的工具包
+        tools_changed = Server.sync_tool_packages(pref.tools)
         selected_client = pref.provider
         for clientclass in MCPClientBase.get_all_clients():
             cname = clientclass.__name__
@@ -63,11 +55,13 @@ class RunCommand(bpy.types.Operator):
             self.report({"ERROR"}, "No client selected")
             return {"FINISHED"}
         client.try_start_client()
+        if tools_changed and (instance := client.get()):
+            # tools/list_changed 通知是异步的, 同一帧提交的命令可能先于通知执行, 这里同步清除工具缓存
+            instance.invalidate_tools()
         # print(all_clients)
         command = bpy.context.scene.mcp_props.command
         if not command:
             return {"FINISHED"}
-        client.get().command_queue.put(command)
         if bpy.context.scene.mcp_props.image:
             from tempfile import gettempdir
             # 保存图片 -> 图片路径 -> client.get().image_queue.put(图片路径)
@@ -75,6 +69,8 @@ class RunCommand(bpy.types.Operator):
             image_path = Path(gettempdir(), f"{image.name}.png").as_posix()
             image.save_render(image_path)
             client.get().image_queue.put(image_path)
+        # 图片入队后再投递命令, 客户端收到命令后会立即处理
+        client.get().submit_command(command)
         return {"FINISHED"}
 
 
@@ -93,6 +89,8 @@ class SkipCurrentCommand(bpy.types.Operator):
         instance = client.get()
         if instance:
             instance.skip_current_command = True
+        # 丢弃内置客户端已排队但尚未执行的工具调用, 其他MCP客户端的调用不受影响
+        BlenderExecutor.get().cancel_pending(BUILTIN_CLIENT_NAME)
         return {"FINISHED"}
 
 
@@ -63,7 +63,53 @@ class AddonPreferences(bpy.types.AddonPreferences):
             self.config.update(config)
             self.should_refresh_models = True
 
-    use_history_message: bpy.props.BoolProperty(default=False, name="Use History Message", translation_context=PROP_TCTX)
+    def dump_client_config(self):
+        return {
+            "base_url": self.base_url,
+            "api_key": self.api_key,
+            "model": self.model,
+            "use_history": self.use_history_message,
+            "history_budget": self.history_token_budget,
+        }
+
+    def update_client_config(self, context):
+        # 配置变化时推送到运行中的客户端
+        client = self.get_client_by_name(self.provider)
+        if client and (instance := client.get()):
+            instance.push_config(self.dump_client_config())
+
+    use_history_message: bpy.props.BoolProperty(default=False, name="Use History Message", update=update_client_config, translation_context=PROP_TCTX)
+
+    history_token_budget: bpy.props.IntProperty(
+        default=16000,
+        min=1000,
+        max=1000000,
+        name="History Token Budget",
+        description="Approximate token limit of the history sent with each request, older tool results are collapsed and the oldest turns dropped beyond it",
+        update=update_client_config,
+        translation_context=PROP_TCTX,
+    )
+
+    def update_server_config(self, context):
+        # 延迟应用, 避免拖动端口等连续修改时反复重启服务器
+        if bpy.app.timers.is_registered(apply_server_config):
+            bpy.app.timers.unregister(apply_server_config)
+        bpy.app.timers.register(apply_server_config, first_interval=1)
+
+    server_transport: bpy.props.EnumProperty(
+        items=[
+            ("sse", "SSE", "Server-Sent Events, compatible with most MCP hosts"),
+            ("streamable-http", "Streamable HTTP", "Request/response on one connection with optional streaming, lower latency for many short tool calls"),
+        ],
+        default="sse",
+        name="Transport",
+        update=update_server_config,
+        translation_context=PROP_TCTX,
+    )
+
+    server_host: bpy.props.StringProperty(default="localhost", name="Host", update=update_server_config, translation_context=PROP_TCTX)
+
+    server_port: bpy.props.IntProperty(default=45677, min=1, max=65535, name="Port", update=update_server_config, translation_context=PROP_TCTX)
 
     def get_tools_items(self, context):
         from .server.tools import ToolsPackageBase
@@ -104,11 +150,12 @@ class AddonPreferences(bpy.types.AddonPreferences):
         translation_context=PROP_TCTX,
     )
 
-    api_key: bpy.props.StringProperty(default="", name="API Key", translation_context=PROP_TCTX)
+    api_key: bpy.props.StringProperty(default="", name="API Key", update=update_client_config, translation_context=PROP_TCTX)
 
     base_url: bpy.props.StringProperty(
         default="https://api.deepseek.com",
         name="Base URL",
+        update=update_client_config,
         translation_context=PROP_TCTX,
     )
 
@@ -140,6 +187,7 @@ class AddonPreferences(bpy.types.AddonPreferences):
     model: bpy.props.StringProperty(
         default="",
         name="Model",
+        update=update_client_config,
         search=search_model,
         search_options={"SORT"},
         translation_context=PROP_TCTX,
@@ -157,7 +205,21 @@ class AddonPreferences(bpy.types.AddonPreferences):
         layout.column().prop(self, "tools", expand=True)
         box = layout.box()
         self.draw_ex(box)
+        box.prop(self, "history_token_budget")
         self.draw_tools_props(box)
+        self.draw_server(layout.box())
+
+    def draw_server(self, layout: bpy.types.UILayout):
+        layout.label(text="Server Settings", text_ctxt=PANEL_TCTX)
+        layout.prop(self, "server_transport")
+        row = layout.row(align=True)
+        row.prop(self, "server_host")
+        row.prop(self, "server_port")
+        from .server.server import Server
+
+        if Server.last_error:
+            layout.alert = True
+            layout.label(text=Server.last_error, icon="ERROR")
 
     def draw_ex(self, layout: bpy.types.UILayout):
         row = layout.row(align=True)
@@ -230,6 +292,13 @@ def init_config(scene):
     pref.load_cache()
 
 
+def apply_server_config():
+    from .server.server import Server
+
+    pref = get_pref()
+    Server.update_config(pref.server_transport, pref.server_host, pref.server_port)
+
+
 def config_checker():
     pref = get_pref()
     pref.refresh_models_check()
@@ -255,4 +324,6 @@ def register():
 def unregister():
     unreg()
     bpy.app.timers.unregister(config_checker)
+    if bpy.app.timers.is_registered(apply_server_config):
+        bpy.app.timers.unregister(apply_server_config)
     bpy.app.handlers.load_post.remove(init_config)
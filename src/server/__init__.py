@@ -1,6 +1,7 @@
 import bpy
 
 reg_modules = [
+    "snapshot",
     "server",
     "tools",
 ]
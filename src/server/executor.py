@@ -1,15 +1,44 @@
+import bpy
+import asyncio
 import functools
 import logging
 import json
-from ..timer import Timer
+import time
+from typing import Callable
+from concurrent.futures import Future
+from mcp.server.fastmcp.utilities.func_metadata import FuncMetadata, func_metadata
+from ..timer import Timer, CancelToken, JobCancelledError, JobTimeoutError
 from .utils import rounding_dumps
+from .stats import ExecutorStats
+from .snapshot import SceneSnapshot
+from .sessions import SessionRegistry, SessionInfo
+from .progress import ProgressReporter
+from .results import ResultStore
 from ..logger import getLogger
 
 logger = getLogger("BlenderExecutor")
 
 
+class ToolTimeoutError(Exception):
+    pass
+
+
+class ToolCancelledError(Exception):
+    pass
+
+
 class BlenderExecutor:
     instance = None
+    functions: dict[str, Callable] = {}
+    # 工具名 -> 参数校验模型(batch_execute 中的调用首次执行时生成)
+    arg_metadata: dict[str, FuncMetadata] = {}
+    stats = ExecutorStats()
+    # 单次工具调用的超时时间(秒), 包含排队和执行时间
+    timeout = 300.0
+    # 控制台打印结果的最大字符数
+    print_limit = 2000
+    # 排队中调用的取消令牌 -> 所属会话的客户端名称(无会话时为None)
+    pending_tokens: dict[CancelToken, str | None] = {}
 
     @classmethod
     def get(cls) -> "BlenderExecutor":
@@ -21,32 +50,192 @@ class BlenderExecutor:
             cls.instance = super().__new__(cls)
         return cls.instance
 
-    def send_function_call(self, func, params):
+    def register_function(self, func: Callable):
+        self.functions[func.__name__] = func
+        self.arg_metadata.pop(func.__name__, None)
+
+    def unregister_function(self, func: Callable):
+        self.functions.pop(func.__name__, None)
+        self.arg_metadata.pop(func.__name__, None)
+
+    def validate_arguments(self, func: Callable, params: dict) -> dict:
+        """
+        与 tools/call 相同的参数校验: JSON字符串预解析, 按类型注解转换(如 "2" -> 2.0)
+        """
+        metadata = self.arg_metadata.get(func.__name__)
+        if metadata is None:
+            metadata = self.arg_metadata[func.__name__] = func_metadata(func)
+        model = metadata.arg_model.model_validate(metadata.pre_parse_json(params))
+        return model.model_dump_one_level()
+
+    def get_stats(self) -> dict:
+        return {"timer": Timer.stats(), "snapshot": SceneSnapshot.stats(), "sessions": SessionRegistry.stats(), "tools": self.stats.summary()}
+
+    @staticmethod
+    def is_read_only(func) -> bool:
+        return getattr(func, "__read_only__", False)
+
+    def make_command(self, func, params) -> dict:
+        return {"func": func, "name": func.__name__, "params": params or {}}
+
+    def submit_command(self, command: dict, timeout: float = None, token: CancelToken = None, group=None) -> Future:
+        command["submit_time"] = time.perf_counter()
+        deadline = command["submit_time"] + timeout if timeout else None
+        return Timer.submit(self.execute_function, (command,), with_context=True, deadline=deadline, token=token, group=group)
+
+    def cancel_pending(self, client_name: str = None):
+        """
+        取消排队中的工具调用(已开始执行的无法中断)
+            client_name: 只取消该客户端会话的调用(如内置客户端跳过命令时不影响外部MCP客户端), 为空时取消全部
+        """
+        for token, name in list(self.pending_tokens.items()):
+            if client_name is None or name == client_name:
+                token.cancel()
+                self.pending_tokens.pop(token, None)
+
+    @staticmethod
+    def make_error(error: str, name: str, **info) -> str:
+        return json.dumps({"error": error, "tool": name, **info}, ensure_ascii=False)
+
+    async def wait_command(self, command: dict, timeout: float, session: SessionInfo = None) -> dict:
+        """
+        session: 调用所属MCP会话, 超出会话并发限制时先在事件循环中等待, 进入主线程队列后与其他会话公平轮询
+        """
+        name = command["name"]
+        token = CancelToken()
+        self.pending_tokens[token] = session.client if session else None
+        start = time.perf_counter()
+        acquired = False
+        try:
+            if session:
+                await session.acquire(timeout)
+                acquired = True
+                command["session"] = session
+            # 排队等待并发配额的时间计入超时
+            remaining = max(timeout - (time.perf_counter() - start), 0.001)
+            future = self.submit_command(command, remaining, token, session.key if session else None)
+            return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+        except (asyncio.TimeoutError, JobTimeoutError):
+            token.cancel()
+            stage = "running" if "queue_wait" in command else "queued" if "submit_time" in command else "throttled"
+            logger.error(f"工具调用超时: {name} ({stage})")
+            raise ToolTimeoutError(self.make_error("timeout", name, timeout=timeout, stage=stage))
+        except JobCancelledError:
+            raise ToolCancelledError(self.make_error("cancelled", name))
+        except asyncio.CancelledError:
+            # MCP请求被取消时, 丢弃尚未执行的任务
+            token.cancel()
+            raise
+        finally:
+            self.pending_tokens.pop(token, None)
+            if acquired:
+                session.release()
+
+    async def send_function_call(self, func, params):
+        session = SessionRegistry.current()
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await self.send_function_call_ex(func, params, session)
+            error = False
+            return result
+        finally:
+            if session:
+                session.record(time.perf_counter() - start, error)
+
+    async def send_function_call_ex(self, func, params, session: SessionInfo = None):
         name = func.__name__
-        command = {"func": func, "name": name,"params": params or {}}
+        command = self.make_command(func, params)
+        command["progress"] = ProgressReporter.from_request()
 
         logger.info(f"收到命令: {name} 参数: {params}")
-        response = Timer.wait_run_with_context(self.execute_function)(command)
+        if self.is_read_only(func) and SceneSnapshot.ready:
+            # 只读工具直接读取场景快照, 无需进入主线程队列
+            response = self.execute_function(command)
+        else:
+            # 等待主线程执行完成, 期间不阻塞事件循环
+            response = await self.wait_command(command, self.timeout, session)
         logger.info(f"执行状态: {response.get('status', 'unknown')}")
+        timing = {"queue_wait": command.get("queue_wait", 0), "execute": command.get("execute", 0)}
 
         if response.get("status") == "error":
+            self.record_stats(name, error=True, **timing)
             logger.error(f"Blender error: {response.get('message')}")
             raise Exception(response.get("message", "Unknown error from Blender"))
-        result_str = rounding_dumps(response.get("result", {}), ensure_ascii=False)
+        start = time.perf_counter()
+        result = response.get("result", {})
+        result_str = rounding_dumps(result, ensure_ascii=False)
+        self.record_stats(name, serialize=time.perf_counter() - start, result_size=len(result_str), **timing)
+        # 结果过大时分页保存为资源, 只返回摘要
+        if paginated := ResultStore.paginate(name, result, result_str):
+            result_str = paginated
+        printed = result_str if len(result_str) <= self.print_limit else f"{result_str[: self.print_limit]}... ({len(result_str)} chars)"
         print("\n--------------------------------", flush=True)
         print(f"\t所选工具: {name}")
-        print(f"\t执行结果: {result_str}")
+        print(f"\t执行结果: {printed}")
         print("--------------------------------\n", flush=True)
         return result_str
 
+    def record_stats(self, name: str, error: bool = False, **values: float):
+        self.stats.record(name, error, **values)
+        if self.stats.should_log():
+            logger.info(f"工具耗时统计:\n{self.stats.format_summary()}")
+
     def execute_function(self, command):
         func = command.get("func")
         name = command.get("name") or func.__name__
+        start = time.perf_counter()
+        if submit_time := command.get("submit_time"):
+            command["queue_wait"] = start - submit_time
+        if session := command.get("session"):
+            session.running += 1
         try:
             params = command.get("params", {})
             logger.info(f"命令执行: {name} 参数: {params}")
-            result = func(**params)
+            with ProgressReporter.activate(command.get("progress")):
+                result = func(**params)
             return {"status": "success", "result": result}
         except Exception as e:
             logger.error(f"Error execute {name}: {str(e)}")
             return {"status": "error", "message": str(e)}
+        finally:
+            command["execute"] = time.perf_counter() - start
+            if session:
+                session.running -= 1
+            if not self.is_read_only(func):
+                # 修改场景后快照失效, 直到depsgraph更新后重新生成
+                SceneSnapshot.invalidate()
+
+    def execute_batch(self, calls: list[dict], stop_on_error: bool = False) -> dict:
+        """
+        在主线程中一次性执行多个工具调用(同一个context override), 结束后只刷新一次view layer
+        """
+        results = []
+        failed = 0
+        for index, call in enumerate(calls):
+            name = call.get("tool", "")
+            params = call.get("arguments") or {}
+            entry = {"index": index, "tool": name}
+            results.append(entry)
+            try:
+                if isinstance(params, str):
+                    params = json.loads(params)
+                func = self.functions.get(name)
+                if not func or name == "batch_execute":
+                    raise ValueError(f"Unknown tool: {name}")
+                command = {"func": func, "name": name, "params": self.validate_arguments(func, params)}
+                response = self.execute_function(command)
+                self.stats.record(name, response["status"] == "error", execute=command["execute"])
+            except Exception as e:
+                response = {"status": "error", "message": str(e)}
+            entry.update(response)
+            if response["status"] == "success":
+                continue
+            failed += 1
+            if stop_on_error:
+                break
+        try:
+            bpy.context.view_layer.update()
+        except Exception as e:
+            logger.warning(f"View layer update failed: {e}")
+        return {"results": results, "succeeded": len(results) - failed, "failed": failed}
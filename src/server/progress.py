@@ -0,0 +1,82 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from threading import local
+
+from mcp.server.lowlevel.server import request_ctx
+from ..logger import getLogger
+
+logger = getLogger("ToolProgress")
+
+
+class ProgressReporter:
+    """
+    工具进度上报: 工具在主线程中执行, 进度通知需要投递回MCP会话所在的事件循环发送
+        仅当调用方在请求中提供了 progressToken 时才会创建
+        min_interval: 最小上报间隔(秒), 完成(progress >= total)时总是上报
+    """
+
+    _local = local()
+    min_interval = 0.1
+
+    def __init__(self, session, progress_token, request_id, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self.progress_token = progress_token
+        self.request_id = request_id
+        self.loop = loop
+        self.last_report = 0.0
+
+    @classmethod
+    def from_request(cls) -> "ProgressReporter | None":
+        """
+        在MCP请求的事件循环中调用, 获取当前请求的进度上报器
+        """
+        try:
+            ctx = request_ctx.get()
+        except LookupError:
+            return None
+        if not ctx.meta or ctx.meta.progressToken is None:
+            return None
+        return cls(ctx.session, ctx.meta.progressToken, ctx.request_id, asyncio.get_running_loop())
+
+    def report(self, progress: float, total: float = None, message: str = None):
+        now = time.perf_counter()
+        finished = total is not None and progress >= total
+        if not finished and now - self.last_report < self.min_interval:
+            return
+        self.last_report = now
+        coro = self.session.send_progress_notification(self.progress_token, progress, total, message, self.request_id)
+        try:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        except RuntimeError:
+            # 事件循环已关闭(会话断开)
+            coro.close()
+
+    @classmethod
+    @contextmanager
+    def activate(cls, reporter: "ProgressReporter | None"):
+        """
+        在当前线程(主线程)中设置进度上报器, 嵌套调用(如batch_execute)时保留外层上报器
+        """
+        if reporter is None:
+            yield
+            return
+        previous = getattr(cls._local, "reporter", None)
+        cls._local.reporter = reporter
+        try:
+            yield
+        finally:
+            cls._local.reporter = previous
+
+    @classmethod
+    def current(cls) -> "ProgressReporter | None":
+        return getattr(cls._local, "reporter", None)
+
+    @classmethod
+    def report_current(cls, progress: float, total: float = None, message: str = None):
+        if not (reporter := cls.current()):
+            return
+        try:
+            reporter.report(progress, total, message)
+        except Exception as e:
+            logger.debug(f"Report progress failed: {e}")
@@ -0,0 +1,135 @@
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+
+from .utils import rounding_dumps
+
+
+class ResultStore:
+    """
+    大结果分页
+        序列化后超过 max_inline 字符的工具结果保存在内存中, 工具只返回摘要和资源URI
+        分页单位: 结果为列表时为列表元素, 为字典时为其中最长的列表字段, 其余情况按 page_chars 切分文本
+        每页按序列化长度填充到 page_chars 字符以内; 单个条目超过 page_chars 时整个结果按文本切分
+        cursor 为起始位置(字符串), 最后一页的 next_cursor 为 None
+        最多保留 max_results 个结果, 超出时丢弃最早的结果
+    """
+
+    max_inline = 16000
+    page_chars = 16000
+    max_results = 32
+    uri_template = "blender://results/{result_id}/{cursor}"
+    results: OrderedDict[str, dict] = OrderedDict()
+    lock = Lock()
+
+    @classmethod
+    def make_uri(cls, result_id: str, cursor: int) -> str:
+        return cls.uri_template.format(result_id=result_id, cursor=cursor)
+
+    @classmethod
+    def page_starts(cls, items: list) -> list[int] | None:
+        """
+        按序列化长度分页, 返回每页起始位置; 有单个条目超过 page_chars 时返回None
+        """
+        starts = [0]
+        size = 0
+        for i, item in enumerate(items):
+            # 加上分隔符
+            length = len(rounding_dumps(item, ensure_ascii=False)) + 1
+            if length > cls.page_chars:
+                return None
+            if size + length > cls.page_chars:
+                starts.append(i)
+                size = 0
+            size += length
+        return starts
+
+    @classmethod
+    def split(cls, result, result_str: str) -> tuple[str | None, list, list[int], bool]:
+        """
+        返回 (分页字段, 分页条目, 每页起始位置, 是否为文本分块)
+        """
+        field, items = None, None
+        if isinstance(result, list) and result:
+            items = result
+        elif isinstance(result, dict):
+            lists = [(len(v), k) for k, v in result.items() if isinstance(v, list)]
+            if lists and max(lists)[0]:
+                field = max(lists)[1]
+                items = result[field]
+        if items and (starts := cls.page_starts(items)):
+            return field, items, starts, False
+        chunks = [result_str[i : i + cls.page_chars] for i in range(0, len(result_str), cls.page_chars)]
+        return None, chunks, list(range(len(chunks))), True
+
+    @classmethod
+    def paginate(cls, name: str, result, result_str: str) -> str | None:
+        """
+        结果过大时保存并返回摘要(JSON字符串), 否则返回None
+        """
+        if len(result_str) <= cls.max_inline:
+            return None
+        field, items, starts, text = cls.split(result, result_str)
+        result_id = uuid4().hex[:12]
+        entry = {"tool": name, "field": field, "items": items, "starts": starts, "text": text, "created": time.time()}
+        with cls.lock:
+            cls.results[result_id] = entry
+            while len(cls.results) > cls.max_results:
+                cls.results.popitem(last=False)
+        summary = None
+        if field:
+            summary = {k: v for k, v in result.items() if k != field}
+            summary[field] = f"<{len(items)} items, paginated>"
+        return rounding_dumps(
+            {
+                "summary": summary,
+                "paginated": {
+                    "result_id": result_id,
+                    "field": field,
+                    "total_items": len(items),
+                    "page_chars": cls.page_chars,
+                    "pages": len(starts),
+                    "size": len(result_str),
+                    "first_page": cls.make_uri(result_id, 0),
+                },
+                "note": "Result too large to return inline. Use fetch_result_page(result_id, cursor) or read the resource URI to get pages, following next_cursor.",
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def get_page(cls, result_id: str, cursor: str | int = 0) -> dict:
+        with cls.lock:
+            entry = cls.results.get(result_id)
+            if entry:
+                cls.results.move_to_end(result_id)
+        if not entry:
+            raise ValueError(f"Result {result_id} not found or expired")
+        try:
+            start = int(cursor or 0)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        items = entry["items"]
+        if start < 0 or start >= len(items):
+            raise ValueError(f"Cursor out of range: {cursor}")
+        starts = entry["starts"]
+        # 下一页的起始位置
+        index = bisect_right(starts, start)
+        end = starts[index] if index < len(starts) else len(items)
+        page = items[start:end]
+        return {
+            "result_id": result_id,
+            "tool": entry["tool"],
+            "field": entry["field"],
+            "cursor": str(start),
+            "next_cursor": str(end) if end < len(items) else None,
+            "total_items": len(items),
+            "items": page[0] if entry["text"] else page,
+        }
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.results.clear()
@@ -0,0 +1,97 @@
+import json
+import inspect
+import hashlib
+import traceback
+from pathlib import Path
+from tempfile import gettempdir
+from threading import Lock
+
+from ..client.tool_spec import ToolSpecCache
+
+
+def get_cache_version() -> str:
+    # schema 由 mcp/pydantic 生成, 版本变化时缓存失效
+    try:
+        from importlib.metadata import version
+
+        return f"1-{version('mcp')}-{version('pydantic')}"
+    except Exception:
+        return "1"
+
+
+class ToolSchemaCache:
+    """
+    工具schema磁盘缓存
+        functions: 函数限定名+源码hash -> 工具名/描述/参数schema, 注册工具时跳过schema生成和描述解析
+        openai: 工具内容hash -> OpenAI格式工具描述, 加载到 ToolSpecCache 供客户端使用
+    """
+
+    cache_file = Path(gettempdir()) / "genesis_core_tool_schemas.json"
+    functions: dict[str, dict] = {}
+    used: set[str] = set()
+    loaded = False
+    dirty = False
+    lock = Lock()
+
+    @classmethod
+    def load(cls):
+        if cls.loaded:
+            return
+        cls.loaded = True
+        if not cls.cache_file.exists():
+            return
+        try:
+            data = json.loads(cls.cache_file.read_text(encoding="utf-8"))
+            if data.get("version") != get_cache_version():
+                return
+            cls.functions.update(data.get("functions", {}))
+            ToolSpecCache.update(data.get("openai", {}))
+        except Exception:
+            traceback.print_exc()
+
+    @classmethod
+    def save(cls):
+        with cls.lock:
+            if not cls.dirty and not ToolSpecCache.dirty:
+                return
+            cls.dirty = False
+            # 只保留本次使用过的条目, 避免源码修改后旧条目不断累积
+            data = {
+                "version": get_cache_version(),
+                "functions": {k: v for k, v in cls.functions.items() if k in cls.used},
+                "openai": ToolSpecCache.dump(),
+            }
+        try:
+            cls.cache_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        except Exception:
+            traceback.print_exc()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def function_key(cls, fn) -> str:
+        fn = inspect.unwrap(fn)
+        try:
+            source = inspect.getsource(fn)
+        except (OSError, TypeError):
+            source = f"{inspect.signature(fn)}\n{fn.__doc__}"
+        return f"{fn.__module__}.{fn.__qualname__}:{cls.hash_text(source)}"
+
+    @classmethod
+    def get_function(cls, key: str) -> dict | None:
+        cls.load()
+        if entry := cls.functions.get(key):
+            cls.used.add(key)
+        return entry
+
+    @classmethod
+    def put_function(cls, key: str, name: str, description: str, parameters: dict):
+        cls.load()
+        with cls.lock:
+            cls.functions[key] = {"name": name, "description": description, "parameters": json.loads(json.dumps(parameters))}
+            cls.used.add(key)
+            cls.dirty = True
+        # 预先生成客户端使用的OpenAI格式描述
+        ToolSpecCache.get_openai_spec(name, description, parameters)
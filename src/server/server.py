@@ -1,12 +1,24 @@
-import re
+import bpy
+import time
+import anyio
 import asyncio
+import inspect
+import weakref
 
 from functools import update_wrapper
-from typing import Callable
+from typing import Callable, Literal
 from threading import Thread
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+from mcp.server.fastmcp.tools import Tool
+from mcp.server.fastmcp.utilities.func_metadata import func_metadata
+from mcp.server.lowlevel.server import NotificationOptions, request_ctx
+from mcp.types import Tool as MCPTool, ToolAnnotations
 from .executor import BlenderExecutor
+from .schema_cache import ToolSchemaCache
+from .results import ResultStore
+from .utils import rounding_dumps
+from ..client.tool_spec import PROPERTY_DESCRIPTION_PATTERN
 from ..logger import getLogger
 
 logger = getLogger("BlenderMCPServer")
@@ -17,48 +29,201 @@ class MakeTool:
         self.executor = BlenderExecutor.get()
         update_wrapper(self, func)
         self.func = func
+        self.executor.register_function(func)
 
-    def __call__(self, *args, **kwargs):
-        return self.executor.send_function_call(self.func, kwargs)
+    async def __call__(self, *args, **kwargs):
+        return await self.executor.send_function_call(self.func, kwargs)
+
+
+def batch_execute(calls: list[dict], stop_on_error: bool = False) -> dict:
+    """
+    Execute multiple tool calls in one step. Prefer this when many objects need to be created or modified at once.
+
+    Args:
+    - calls: List of tool calls in order, each like {"tool": "create_object", "arguments": {"name": "Cube"}}
+    - stop_on_error: Stop executing the remaining calls after the first failure
+
+    Returns:
+    The result or error of each call in the same order.
+    """
+    return BlenderExecutor.get().execute_batch(calls, stop_on_error)
+
+
+def get_executor_stats() -> str:
+    """
+    Get latency statistics of Blender tool calls: queue wait, main thread execution and serialization time (ms), and result size per tool, per-session queue state and latency, plus scene info cache hits/misses.
+    """
+    return rounding_dumps(BlenderExecutor.get().get_stats(), ensure_ascii=False)
+
+
+def fetch_result_page(result_id: str, cursor: str = "0") -> str:
+    """
+    Fetch one page of a large tool result that was returned as paginated. Call again with next_cursor until it is null.
+
+    Args:
+    - result_id: The result_id from the paginated tool result
+    - cursor: The page cursor, "0" for the first page or the next_cursor of the previous page
+    """
+    return rounding_dumps(ResultStore.get_page(result_id, cursor), ensure_ascii=False)
+
+
+def read_result_page(result_id: str, cursor: str) -> str:
+    """
+    One page of a large Blender tool result
+    """
+    return fetch_result_page(result_id, cursor)
+
+
+class LazyFuncMetadata:
+    """
+    延迟生成参数校验模型: 从缓存注册的工具在首次调用时才创建pydantic模型
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._metadata = None
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = func_metadata(self.fn)
+        return self._metadata
+
+    async def call_fn_with_arg_validation(self, *args, **kwargs):
+        return await self.metadata.call_fn_with_arg_validation(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.metadata, name)
 
 
 class BlenderMCPServer(FastMCP):
+    property_description_pattern = PROPERTY_DESCRIPTION_PATTERN
+    # 缓存注册依赖 Tool 的字段结构, mcp版本变化时退回到常规注册
+    cached_tool_fields = {"fn", "name", "description", "parameters", "fn_metadata", "is_async", "context_kwarg", "annotations"}
+
     def __init__(self, *args, **settings):
         super().__init__(*args, **settings)
         self.make_tool = MakeTool
+        # 获取过工具列表的会话及其事件循环, 工具变化时向其发送 tools/list_changed
+        self.tool_list_sessions: "weakref.WeakKeyDictionary[object, asyncio.AbstractEventLoop]" = weakref.WeakKeyDictionary()
+        # 声明 tools.listChanged 能力
+        create_initialization_options = self._mcp_server.create_initialization_options
+
+        def create_options(notification_options: NotificationOptions = None, experimental_capabilities: dict = None):
+            notification_options = notification_options or NotificationOptions(tools_changed=True)
+            return create_initialization_options(notification_options, experimental_capabilities)
+
+        self._mcp_server.create_initialization_options = create_options
+
+    async def list_tools(self) -> list[MCPTool]:
+        try:
+            self.tool_list_sessions[request_ctx.get().session] = asyncio.get_running_loop()
+        except LookupError:
+            pass
+        return await super().list_tools()
 
-    def add_tool(self, *arg, **kwargs):
-        res = super().add_tool(*arg, **kwargs)
-        # self.list_tools 是异步方法
-        tool = asyncio.run(self.list_tools())[-1]
+    def notify_tools_changed(self):
+        """
+        通知已获取工具列表的会话刷新工具列表(可在任意线程调用)
+        """
+        for session, loop in list(self.tool_list_sessions.items()):
+            coro = session.send_tool_list_changed()
+            try:
+                asyncio.run_coroutine_threadsafe(coro, loop)
+            except RuntimeError:
+                # 事件循环已关闭(会话断开)
+                coro.close()
+                self.tool_list_sessions.pop(session, None)
+
+    def remove_tool(self, name: str):
+        manager = self._tool_manager
+        if hasattr(manager, "remove_tool"):
+            manager.remove_tool(name)
+        else:
+            # 旧版本mcp的ToolManager没有remove_tool
+            manager._tools.pop(name, None)
+
+    @classmethod
+    def parse_property_descriptions(cls, description: str) -> dict[str, str]:
+        descriptions = {}
+        for name, info in cls.property_description_pattern.findall(description or ""):
+            descriptions.setdefault(name, info.strip())
+        return descriptions
+
+    def add_tool(self, fn, name: str = None, description: str = None, annotations: ToolAnnotations = None):
+        key = ToolSchemaCache.function_key(fn)
+        if (cached := ToolSchemaCache.get_function(key)) and (tool := self.add_cached_tool(fn, cached, name, description, annotations)):
+            return tool
+        # 直接使用新建的工具, 避免每次注册都重新生成完整的工具列表
+        tool = self._tool_manager.add_tool(fn, name=name, description=description, annotations=annotations)
         try:
-            properties = tool.inputSchema["properties"]
-            description = tool.description
-            for name, info in properties.items():
-                # - name: description.....\n
-                find_description = re.search(f"- {name}: (.*)\n", description)
-                if not find_description:
+            # 从description中获取属性描述
+            descriptions = self.parse_property_descriptions(tool.description)
+            for pname, info in tool.parameters.get("properties", {}).items():
+                if pname not in descriptions:
                     continue
-                info["description"] = find_description.group(1)
-                logger.debug(f"添加描述 - {name}: {info['description']}")
-                # 从description中获取属性描述
+                info["description"] = descriptions[pname]
+                logger.debug(f"添加描述 - {pname}: {info['description']}")
         except Exception as e:
             logger.warning(f"Build property description failed: {e}")
-        return res
+        ToolSchemaCache.put_function(key, tool.name, tool.description, tool.parameters)
+        return tool
+
+    def add_cached_tool(self, fn, cached: dict, name: str = None, description: str = None, annotations: ToolAnnotations = None) -> Tool | None:
+        if set(Tool.model_fields) != self.cached_tool_fields:
+            return None
+        name = name or fn.__name__
+        if name != cached["name"]:
+            return None
+        if tool := self._tool_manager.get_tool(name):
+            return tool
+        signature = inspect.signature(fn)
+        if any(p.annotation is Context for p in signature.parameters.values()):
+            return None
+        tool = Tool.model_construct(
+            fn=fn,
+            name=name,
+            description=description or cached["description"],
+            parameters=cached["parameters"],
+            fn_metadata=LazyFuncMetadata(fn),
+            is_async=inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(getattr(fn, "__call__", None)),
+            context_kwarg=None,
+            annotations=annotations,
+        )
+        self._tool_manager._tools[name] = tool
+        return tool
 
 
 class Server:
     host: str = "localhost"
     port: int = 45677
+    # sse: 兼容旧版MCP宿主, streamable-http: 单连接请求/响应(可选流式), 适合大量短工具调用
+    transport: Literal["sse", "streamable-http"] = "sse"
     server: "BlenderMCPServer" = None
+    http_server = None
+    thread: Thread = None
+    # 停止时等待连接关闭的最长时间(秒), SSE长连接不会主动结束
+    shutdown_timeout = 1
+    # 重启时等待旧服务器线程结束的最长时间(秒)
+    restart_timeout = 10.0
+    restart_deadline = 0.0
+    # 最近一次启动失败(如端口被占用)的原因, 显示在偏好设置中
+    last_error = ""
     tools: dict[Callable, None] = {}
     make_tool = MakeTool
-    tool_wraper: None
+    # 上次同步时启用的工具包
+    applied_packages: set[str] = set()
+    builtin_tools: list[Callable] = [batch_execute]
+    # 不需要进入主线程执行的工具, 直接注册到MCP服务器(均无副作用, 标记为只读, 客户端不会将其合并到 batch_execute)
+    direct_tools: list[Callable] = [get_executor_stats, fetch_result_page]
 
     @classmethod
     def init(cls):
         cls.server = BlenderMCPServer(name="BlenderMCPServer", host=cls.host, port=cls.port)
-        cls.tool_wraper = cls.server.tool()
+        cls.register_tools(cls.builtin_tools)
+        for tool in cls.direct_tools:
+            cls.server.add_tool(tool, annotations=ToolAnnotations(readOnlyHint=True))
+        cls.server.resource(ResultStore.uri_template, name="tool_result_page", mime_type="application/json")(read_result_page)
 
     @classmethod
     def register_tool(cls, tool: Callable) -> None:
@@ -66,12 +231,16 @@ class Server:
             return
         t = cls.make_tool(tool)
         cls.tools[tool] = t
-        cls.tool_wraper(t)
+        annotations = None
+        if BlenderExecutor.is_read_only(tool):
+            annotations = ToolAnnotations(readOnlyHint=True)
+        cls.server.add_tool(t, annotations=annotations)
 
     @classmethod
     def register_tools(cls, tools: list[Callable]) -> None:
         for tool in tools:
             cls.register_tool(tool)
+        ToolSchemaCache.save()
 
     @classmethod
     def unregister_tool(cls, tool: Callable) -> None:
@@ -79,7 +248,8 @@ class Server:
             return
         try:
             t = cls.tools.pop(tool, None)
-            cls.server._tool_manager._tools.pop(t.__name__)
+            t.executor.unregister_function(tool)
+            cls.server.remove_tool(t.__name__)
         except Exception as e:
             logger.warning(f"Unregister tool failed: {e}")
 
@@ -88,24 +258,156 @@ class Server:
         for tool in tools:
             cls.unregister_tool(tool)
 
+    @classmethod
+    def sync_tool_packages(cls, enabled: set[str]) -> bool:
+        """
+        与上次同步的启用工具包对比, 只注册/注销变化的工具包, 有变化时通知客户端刷新工具列表
+        """
+        from .tools import ToolsPackageBase
+
+        enabled = set(enabled)
+        added = enabled - cls.applied_packages
+        removed = cls.applied_packages - enabled
+        if not added and not removed:
+            return False
+        for name in removed:
+            if tp := ToolsPackageBase.get_package(name):
+                cls.unregister_tools(tp.get_all_tools())
+        for name in added:
+            if tp := ToolsPackageBase.get_package(name):
+                cls.register_tools(tp.get_all_tools())
+        cls.applied_packages = enabled
+        logger.info(f"工具包已同步: +{sorted(added)} -{sorted(removed)}")
+        cls.server.notify_tools_changed()
+        return True
+
+    @classmethod
+    def load_config(cls):
+        from ..preference import get_pref
+
+        try:
+            pref = get_pref()
+        except Exception:
+            # 插件启用过程中偏好设置可能尚不可用, 使用默认配置
+            return
+        cls.configure(pref.server_transport, pref.server_host, pref.server_port)
+
+    @classmethod
+    def configure(cls, transport: str, host: str, port: int) -> bool:
+        """
+        更新传输方式/地址, 返回配置是否变化
+        """
+        config = (transport, host or "localhost", port)
+        if config == (cls.transport, cls.host, cls.port):
+            return False
+        cls.transport, cls.host, cls.port = config
+        return True
+
+    @classmethod
+    def get_url(cls) -> str:
+        settings = cls.server.settings if cls.server else None
+        path = settings.streamable_http_path if settings else "/mcp"
+        if cls.transport == "sse":
+            path = settings.sse_path if settings else "/sse"
+        return f"http://{cls.host}:{cls.port}{path}"
+
+    @classmethod
+    def make_app(cls):
+        settings = cls.server.settings
+        settings.host, settings.port = cls.host, cls.port
+        if cls.transport == "streamable-http":
+            # StreamableHTTPSessionManager 只能运行一次, 重启时需要重新创建
+            cls.server._session_manager = None
+            return cls.server.streamable_http_app()
+        return cls.server.sse_app()
+
+    @classmethod
+    async def serve(cls):
+        import uvicorn
+
+        config = uvicorn.Config(
+            cls.make_app(),
+            host=cls.host,
+            port=cls.port,
+            log_level=cls.server.settings.log_level.lower(),
+            timeout_graceful_shutdown=cls.shutdown_timeout,
+        )
+        cls.http_server = http_server = uvicorn.Server(config)
+        await http_server.serve()
+        if not http_server.started and not http_server.should_exit:
+            raise OSError(f"Failed to start server on {cls.host}:{cls.port}")
+
     @classmethod
     def main(cls):
         if not cls.server:
             cls.init()
-        logger.info("创世核心正在运转...")
-        cls.server.run(transport="sse")
+        logger.info(f"创世核心正在运转... {cls.get_url()}")
+        try:
+            anyio.run(cls.serve)
+        except (OSError, SystemExit) as e:
+            # uvicorn 绑定端口失败时调用 sys.exit
+            cls.last_error = f"Failed to start server on {cls.host}:{cls.port}, the port may be in use"
+            logger.error(f"服务器启动失败: {cls.host}:{cls.port} ({e})")
 
     @classmethod
     def run(cls):
         """Run the MCP server"""
-        job = Thread(target=cls.main, daemon=True)
-        job.start()
+        cls.last_error = ""
+        cls.thread = Thread(target=cls.main, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def stop(cls, wait: float = 0.1):
+        """
+        通知服务器退出, 主线程中只短暂等待, 未结束的线程由 restart 轮询
+        """
+        if cls.http_server:
+            cls.http_server.should_exit = True
+            # 不等待SSE等长连接自然结束
+            cls.http_server.force_exit = True
+        if cls.thread and cls.thread.is_alive() and wait:
+            cls.thread.join(timeout=wait)
+        cls.http_server = None
+
+    @classmethod
+    def restart(cls):
+        cls.stop()
+        cls.restart_deadline = time.monotonic() + cls.restart_timeout
+        if bpy.app.timers.is_registered(run_when_stopped):
+            return
+        bpy.app.timers.register(run_when_stopped, first_interval=0)
+
+    @classmethod
+    def run_when_stopped(cls):
+        # 旧服务器线程结束(端口释放)后再启动, 避免绑定失败
+        if cls.thread and cls.thread.is_alive():
+            if time.monotonic() < cls.restart_deadline:
+                return 0.1
+            cls.last_error = f"Previous server on {cls.host}:{cls.port} did not stop in time"
+            logger.error("旧服务器未能及时停止, 放弃重启")
+            return None
+        cls.run()
+        return None
+
+    @classmethod
+    def update_config(cls, transport: str, host: str, port: int):
+        if not cls.configure(transport, host, port):
+            return
+        logger.info(f"服务器配置已更新, 正在重启: {cls.get_url()}")
+        cls.restart()
 
 
 def register():
+    Server.load_config()
     Server.init()
     Server.run()
 
 
+def run_when_stopped():
+    return Server.run_when_stopped()
+
+
 def unregister():
-    pass
+    if bpy.app.timers.is_registered(run_when_stopped):
+        bpy.app.timers.unregister(run_when_stopped)
+    Server.stop(wait=1)
@@ -0,0 +1,107 @@
+import asyncio
+import weakref
+from itertools import count
+from threading import Lock
+
+from mcp.server.lowlevel.server import request_ctx
+from .stats import RollingHistogram
+from ..timer import Timer
+
+# 内置客户端连接时使用的 clientInfo.name
+BUILTIN_CLIENT_NAME = "GenesisCore"
+
+
+class SessionInfo:
+    """
+    单个MCP会话的调度状态
+        waiting: 因并发限制等待进入主线程队列的调用数
+        queued: 已进入主线程队列, 尚未执行的调用数(由 Timer 按分组统计)
+        running: 正在主线程执行的调用数
+    """
+
+    def __init__(self, key: int, name: str, weight: int, max_concurrency: int, client: str = ""):
+        self.key = key
+        self.name = name
+        # clientInfo.name (不含会话序号)
+        self.client = client
+        self.weight = weight
+        self.waiting = 0
+        self.running = 0
+        self.calls = 0
+        self.errors = 0
+        self.latency = RollingHistogram()
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, timeout: float):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.semaphore.release()
+
+    def record(self, latency: float, error: bool = False):
+        self.calls += 1
+        self.errors += error
+        self.latency.add(latency)
+
+    def summary(self, queued: int = 0) -> dict:
+        return {
+            "waiting": self.waiting,
+            "queued": queued,
+            "running": self.running,
+            "calls": self.calls,
+            "errors": self.errors,
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "latency_ms": self.latency.summary(1000),
+        }
+
+
+class SessionRegistry:
+    """
+    按MCP会话记录调度状态, 会话断开(对象回收)后自动移除
+        每个会话在主线程队列中是独立的公平调度分组, 权重按 clientInfo.name 配置
+        max_concurrency: 每个会话同时进入主线程队列的工具调用上限, 超出的调用在事件循环中等待
+    """
+
+    max_concurrency = 4
+    # 内置客户端获得双倍配额, 避免被外部高频调用的Agent饿死
+    client_weights: dict[str, int] = {BUILTIN_CLIENT_NAME: 2}
+    sessions: "weakref.WeakKeyDictionary[object, SessionInfo]" = weakref.WeakKeyDictionary()
+    lock = Lock()
+    _keys = count(1)
+
+    @classmethod
+    def get_weight(cls, name: str) -> int:
+        return cls.client_weights.get(name, 1)
+
+    @classmethod
+    def current(cls) -> SessionInfo | None:
+        """
+        获取当前MCP请求所属会话(不在MCP请求上下文中时返回None)
+        """
+        try:
+            session = request_ctx.get().session
+        except LookupError:
+            return None
+        with cls.lock:
+            if info := cls.sessions.get(session):
+                return info
+            key = next(cls._keys)
+            params = session.client_params
+            client = params.clientInfo.name if params else "unknown"
+            info = cls.sessions[session] = SessionInfo(key, f"{client}#{key}", cls.get_weight(client), cls.max_concurrency, client)
+        Timer.set_group_weight(key, info.weight)
+        weakref.finalize(session, Timer.remove_group, key)
+        return info
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls.lock:
+            infos = list(cls.sessions.values())
+        sizes = Timer.group_sizes()
+        return {info.name: info.summary(sizes.get(info.key, 0)) for info in infos}
@@ -0,0 +1,218 @@
+import bpy
+import threading
+from mathutils import Vector
+
+
+class SceneSnapshot:
+    """
+    场景快照: 名称/变换/包围盒/类型/材质等只读数据
+        objects: 以对象名为key的信息缓存, 由 depsgraph_update_post 增量更新, 只重新采集被更新的对象
+            场景/集合更新(对象增删)时对比全部对象名称, 只有集合更新时才刷新全部对象的可见性
+        invalidate: 执行修改场景的工具后标记失效, 直到下次同步
+        ready 为 True 时, 只读工具可以在非主线程中直接读取快照
+    """
+
+    ready = False
+    scene: dict = {}
+    objects: dict[str, dict] = {}
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def capture_object(cls, obj: bpy.types.Object) -> dict:
+        info = {
+            "name": obj.name,
+            "type": obj.type,
+            "location": tuple(obj.location),
+            "rotation": tuple(obj.rotation_euler),
+            "scale": tuple(obj.scale),
+            "visible": obj.visible_get(),
+            "bound_box": [tuple(obj.matrix_world @ Vector(v)) for v in obj.bound_box],
+            "materials": [slot.material.name for slot in obj.material_slots if slot.material],
+        }
+        if obj.type == "MESH" and obj.data:
+            mesh = obj.data
+            info["mesh"] = {
+                "vertices": len(mesh.vertices),
+                "edges": len(mesh.edges),
+                "polygons": len(mesh.polygons),
+            }
+        return info
+
+    @classmethod
+    def capture_scene(cls, scene: bpy.types.Scene, view_layer: bpy.types.ViewLayer) -> dict:
+        active = view_layer.objects.active
+        return {
+            "name": scene.name,
+            "blender_version": bpy.app.version,
+            "object_names": scene.objects.keys(),
+            "materials_count": len(bpy.data.materials),
+            "selected": view_layer.objects.selected.keys(),
+            "active": active.name if active else "",
+        }
+
+    @classmethod
+    def sync(
+        cls,
+        scene: bpy.types.Scene = None,
+        view_layer: bpy.types.ViewLayer = None,
+        stale: set[str] = (),
+        structure_changed=True,
+        scene_changed=True,
+        visibility_changed=True,
+    ):
+        """
+        增量同步(主线程)
+            stale: 有更新的对象(变换/几何/着色/重命名/显示状态等), 只重新采集这些对象
+            structure_changed: 可能有对象增删(场景/集合更新), 对比对象名称
+            scene_changed: 重新收集场景级数据(选择/活动对象/材质数量等)
+            visibility_changed: 集合可见性可能变化, 刷新全部对象的可见性
+        """
+        scene = scene or bpy.context.scene
+        view_layer = view_layer or bpy.context.view_layer
+        data_objects = bpy.data.objects
+        objects = cls.objects
+        added = removed = ()
+        # 重命名的对象以新名称出现在stale中, 同样需要对比名称
+        if structure_changed or any(name not in objects for name in stale):
+            names = set(data_objects.keys())
+            removed = objects.keys() - names
+            added = names - objects.keys()
+        if added or removed or visibility_changed:
+            # 复制后整体替换引用, 其他线程读取时不会看到中间状态
+            objects = dict(objects)
+            for name in removed:
+                objects.pop(name)
+            for name in added:
+                objects[name] = cls.capture_object(data_objects[name])
+                cls.misses += 1
+        # 其余情况(如交互拖动)原地替换被更新的条目, 不复制整个缓存
+        for name in stale:
+            if name in added or name not in data_objects:
+                continue
+            objects[name] = cls.capture_object(data_objects[name])
+            cls.misses += 1
+        if visibility_changed:
+            # 集合可见性变化不会标记其中对象的更新
+            for name, info in objects.items():
+                if name in added:
+                    continue
+                visible = data_objects[name].visible_get(view_layer=view_layer)
+                if info["visible"] != visible:
+                    objects[name] = {**info, "visible": visible}
+        if scene_changed or added or removed:
+            cls.scene = cls.capture_scene(scene, view_layer)
+        cls.objects = objects
+        cls.ready = True
+
+    @classmethod
+    def refresh(cls, scene: bpy.types.Scene = None, view_layer: bpy.types.ViewLayer = None):
+        cls.objects = {}
+        cls.sync(scene, view_layer)
+
+    @classmethod
+    def invalidate(cls):
+        cls.ready = False
+
+    @classmethod
+    def reset(cls):
+        cls.ready = False
+        cls.objects = {}
+
+    @classmethod
+    def ensure(cls):
+        if cls.ready or threading.current_thread() is not threading.main_thread():
+            return
+        try:
+            # 触发depsgraph求值, 已标记的更新会经由 depsgraph_update_post 增量同步
+            bpy.context.evaluated_depsgraph_get()
+        except Exception:
+            ...
+        if not cls.ready:
+            cls.sync()
+
+    @classmethod
+    def stats(cls) -> dict:
+        total = cls.hits + cls.misses
+        return {
+            "ready": cls.ready,
+            "objects": len(cls.objects),
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "hit_rate": cls.hits / total if total else 0.0,
+        }
+
+    @classmethod
+    def get_scene(cls) -> dict:
+        cls.ensure()
+        return cls.scene
+
+    @classmethod
+    def get_object(cls, name: str) -> dict | None:
+        cls.ensure()
+        info = cls.objects.get(name)
+        if info:
+            cls.hits += 1
+        return info
+
+    @classmethod
+    def get_scene_objects(cls) -> list[dict]:
+        cls.ensure()
+        objects = cls.objects
+        infos = [objects[name] for name in cls.scene["object_names"] if name in objects]
+        cls.hits += len(infos)
+        return infos
+
+
+@bpy.app.handlers.persistent
+def on_depsgraph_update_post(scene, depsgraph=None):
+    try:
+        if not depsgraph:
+            SceneSnapshot.sync(scene)
+            return
+        stale = set()
+        # 缓存为空(首次同步或重置后), 或执行修改类工具后快照已失效(工具可能做了任何修改): 完整同步
+        full = not SceneSnapshot.objects or not SceneSnapshot.ready
+        structure_changed = scene_changed = visibility_changed = full
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Object):
+                # 不只是变换/几何/着色, 重命名, 显示状态等更新也重新采集
+                stale.add(id_data.name)
+            elif isinstance(id_data, bpy.types.Collection):
+                # 对象增删, 集合可见性
+                structure_changed = scene_changed = visibility_changed = True
+            elif isinstance(id_data, bpy.types.Scene):
+                # 对象增删, 选择/活动对象
+                structure_changed = scene_changed = True
+            elif isinstance(id_data, bpy.types.Material):
+                scene_changed = True
+        SceneSnapshot.sync(scene, depsgraph.view_layer, stale, structure_changed, scene_changed, visibility_changed)
+    except Exception:
+        SceneSnapshot.reset()
+
+
+@bpy.app.handlers.persistent
+def on_invalidate(*args):
+    # 加载文件/撤销后ID全部重建, 清空缓存
+    SceneSnapshot.reset()
+
+
+handlers = [
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.load_post, on_invalidate),
+    (bpy.app.handlers.undo_post, on_invalidate),
+    (bpy.app.handlers.redo_post, on_invalidate),
+]
+
+
+def register():
+    for handler_list, handler in handlers:
+        handler_list.append(handler)
+
+
+def unregister():
+    SceneSnapshot.reset()
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
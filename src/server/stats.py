@@ -0,0 +1,97 @@
+import time
+from collections import deque
+from threading import Lock
+
+
+class RollingHistogram:
+    """
+    滚动统计: 只保留最近 size 个样本, 用于计算分位数
+    """
+
+    def __init__(self, size: int = 256):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self, scale: float = 1.0) -> dict:
+        if not self.samples:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "avg": self.total / self.count * scale,
+            "p50": self.percentile(50) * scale,
+            "p95": self.percentile(95) * scale,
+            "max": max(self.samples) * scale,
+        }
+
+
+class ToolStats:
+    # 时间类指标单位为秒, 输出时转换为毫秒
+    time_metrics = ("queue_wait", "execute", "serialize")
+    size_metrics = ("result_size",)
+
+    def __init__(self):
+        self.histograms = {m: RollingHistogram() for m in self.time_metrics + self.size_metrics}
+        self.errors = 0
+
+    def summary(self) -> dict:
+        summary = {f"{m}_ms": self.histograms[m].summary(1000) for m in self.time_metrics}
+        summary.update({m: self.histograms[m].summary() for m in self.size_metrics})
+        summary["errors"] = self.errors
+        return summary
+
+
+class ExecutorStats:
+    """
+    按工具名统计: 排队等待时间, 主线程执行时间, 序列化时间及结果大小
+    """
+
+    def __init__(self, log_interval: float = 300):
+        self.tools: dict[str, ToolStats] = {}
+        self.lock = Lock()
+        self.log_interval = log_interval
+        self.last_log_time = time.monotonic()
+
+    def record(self, name: str, error: bool = False, **values: float):
+        with self.lock:
+            stats = self.tools.setdefault(name, ToolStats())
+            if error:
+                stats.errors += 1
+            for metric, value in values.items():
+                stats.histograms[metric].add(value)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {name: stats.summary() for name, stats in self.tools.items()}
+
+    def should_log(self) -> bool:
+        now = time.monotonic()
+        if now - self.last_log_time < self.log_interval:
+            return False
+        self.last_log_time = now
+        return True
+
+    def format_summary(self) -> str:
+        lines = []
+        summary = self.summary()
+        # 按p95执行时间排序, 慢工具在前
+        for name, s in sorted(summary.items(), key=lambda i: -i[1]["execute_ms"].get("p95", 0)):
+            wait, execute, serialize = s["queue_wait_ms"], s["execute_ms"], s["serialize_ms"]
+            lines.append(
+                f"{name}: calls={execute['count']} errors={s['errors']} "
+                f"wait_p95={wait.get('p95', 0):.1f}ms exec_p95={execute.get('p95', 0):.1f}ms "
+                f"serialize_p95={serialize.get('p95', 0):.1f}ms size_p95={s['result_size'].get('p95', 0):.0f}"
+            )
+        return "\n".join(lines)
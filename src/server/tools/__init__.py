@@ -1,4 +1,4 @@
-from .common import ToolsPackageBase
+from .common import ToolsPackageBase, read_only
 from .asset_tools import AssetTools
 from .common_tools import CommonTools
 from .material_tools import MaterialTools
@@ -1,11 +1,19 @@
 import bpy
 
 
+def read_only(func):
+    """
+    标记工具为只读: 工具只从 SceneSnapshot 读取数据, 快照有效时无需进入主线程队列
+    """
+    func.__read_only__ = True
+    return func
+
+
 class ToolsPackageBase:
     "Base class for all tools"
 
     __tools__: dict[str, "ToolsPackageBase"] = {}
-    __exclude_tool_names__: set[str] = {"draw_pref_props", "register", "unregister"}
+    __exclude_tool_names__: set[str] = {"draw_pref_props", "register", "unregister", "report_progress"}
     __pref_props__: dict = {}
 
     @classmethod
@@ -38,6 +46,15 @@ class ToolsPackageBase:
     def draw_pref_props(cls, pref, layout: bpy.types.UILayout):
         pass
 
+    @classmethod
+    def report_progress(cls, progress: float, total: float = None, message: str = None):
+        """
+        在工具执行过程中上报进度(调用方提供 progressToken 时以MCP进度通知发送, 否则忽略)
+        """
+        from ..progress import ProgressReporter
+
+        ProgressReporter.report_current(progress, total, message)
+
     @classmethod
     def get_pref(cls):
         from ...preference import get_pref
@@ -1,6 +1,7 @@
 import bpy
 import traceback
-from .common import ToolsPackageBase
+from .common import ToolsPackageBase, read_only
+from ..snapshot import SceneSnapshot
 
 
 class CommonTools(ToolsPackageBase):
@@ -8,28 +9,32 @@ class CommonTools(ToolsPackageBase):
     Common tools for Blender.
     """
 
+    @read_only
     def get_simple_info() -> dict:
         """Get basic Blender information"""
-        return {"blender_version": bpy.app.version, "scene_name": bpy.context.scene.name, "object_count": len(bpy.context.scene.objects)}
+        scene = SceneSnapshot.get_scene()
+        return {"blender_version": scene["blender_version"], "scene_name": scene["name"], "object_count": len(scene["object_names"])}
 
+    @read_only
     def get_scene_info() -> dict:
         """Get information about the current Blender scene"""
         try:
             print("Getting scene info...")
+            scene = SceneSnapshot.get_scene()
             # Simplify the scene info to reduce data size
             scene_info = {
-                "name": bpy.context.scene.name,
-                "object_count": len(bpy.context.scene.objects),
+                "name": scene["name"],
+                "object_count": len(scene["object_names"]),
                 "objects": [],
-                "materials_count": len(bpy.data.materials),
+                "materials_count": scene["materials_count"],
             }
 
-            # Collect minimal object information (limit to first 10 objects)
-            for obj in bpy.context.scene.objects:
+            # Collect minimal object information
+            for obj in SceneSnapshot.get_scene_objects():
                 obj_info = {
-                    "name": obj.name,
-                    "type": obj.type,
-                    "location": tuple(obj.location),
+                    "name": obj["name"],
+                    "type": obj["type"],
+                    "location": obj["location"],
                 }
                 scene_info["objects"].append(obj_info)
 
@@ -40,20 +45,22 @@ class CommonTools(ToolsPackageBase):
             traceback.print_exc()
             return {"error": str(e)}
 
+    @read_only
     def get_active_object_name() -> dict:
         """
         Get the name of active object in the Blender scene.
         """
-        obj = bpy.context.view_layer.objects.active
-        if not obj:
+        name = SceneSnapshot.get_scene()["active"]
+        if not name:
             raise ValueError("No active object found")
-        return {"name": obj.name}
+        return {"name": name}
 
+    @read_only
     def get_selected_objects_names() -> dict:
         """
         Get the names of selected objects in the Blender scene.
         """
-        return {"names": [obj.name for obj in bpy.context.selected_objects]}
+        return {"names": list(SceneSnapshot.get_scene()["selected"])}
 
     def execute_blender_code(code: str) -> dict:
         """
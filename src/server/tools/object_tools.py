@@ -1,7 +1,8 @@
 import bpy
 from mathutils import Vector
 from typing import List
-from .common import ToolsPackageBase
+from .common import ToolsPackageBase, read_only
+from ..snapshot import SceneSnapshot
 
 
 class ObjectTools(ToolsPackageBase):
@@ -9,6 +10,7 @@ class ObjectTools(ToolsPackageBase):
     Object tools for the Blender scene.
     """
 
+    @read_only
     def get_object_info(object_name: str) -> dict:
         """
         Get detailed information about a specific object in the Blender scene.
@@ -16,34 +18,10 @@ class ObjectTools(ToolsPackageBase):
         Args:
         - object_name: The name of the object to get information about
         """
-        obj = bpy.data.objects.get(object_name)
-        if not obj:
+        obj_info = SceneSnapshot.get_object(object_name)
+        if not obj_info:
             raise ValueError(f"Object not found: {object_name}")
-
-        # Basic object info
-        obj_info = {
-            "name": obj.name,
-            "type": obj.type,
-            "location": tuple(obj.location),
-            "rotation": tuple(obj.rotation_euler),
-            "scale": tuple(obj.scale),
-            "visible": obj.visible_get(),
-            "bound_box": [tuple(obj.matrix_world @ Vector(v)) for v in obj.bound_box],
-            "materials": [],
-        }
-
-        obj_info["materials"] = [slot.material.name for slot in obj.material_slots if slot.material]
-
-        # Add mesh data if applicable
-        if obj.type == "MESH" and obj.data:
-            mesh = obj.data
-            obj_info["mesh"] = {
-                "vertices": len(mesh.vertices),
-                "edges": len(mesh.edges),
-                "polygons": len(mesh.polygons),
-            }
-
-        return obj_info
+        return dict(obj_info)
 
     def create_object(
         entity_type: str = "CUBE",
@@ -18,6 +18,9 @@ class PolyhavenHelper:
     tags_cache = {}
     categories_cache = {}
     files_cache = {}
+    # (连接超时, 读取超时)
+    timeout = (10, 60)
+    chunk_size = 64 * 1024
 
     @classmethod
     def fetch_assets_by_type(cls, asset_type: str) -> dict:
@@ -108,7 +111,7 @@ class PolyhavenHelper:
         return file
 
     @classmethod
-    def download_hdri_file(cls, asset_id: str, expected_resolution: str = "1k") -> str:
+    def download_hdri_file(cls, asset_id: str, expected_resolution: str = "1k", on_progress=None) -> str:
         files = cls.fetch_hdri_file(asset_id, expected_resolution)
         if not files:
             return {}
@@ -134,25 +137,41 @@ class PolyhavenHelper:
         url = file["url"]
         size = int(file["size"])
         md5_hash = file["md5"]
-        hdri_file = cls.download_file(url, asset_id, size, hdri_cache_path, md5_hash)
+        hdri_file = cls.download_file(url, asset_id, size, hdri_cache_path, md5_hash, cls.progress_callback(on_progress, asset_id, 0, size))
 
         return {"hdri": hdri_file}
 
+    @staticmethod
+    def progress_callback(on_progress, name: str, offset: int, total: int):
+        """
+        将单个文件的下载进度转换为所有文件的总进度: on_progress(已下载字节数, 总字节数, 阶段描述)
+        """
+        if not on_progress:
+            return None
+        return lambda done, size: on_progress(offset + done, total, f"Downloading {name}")
+
     @classmethod
-    def download_file(cls, url: str, name: str, size: int, file_path: str, md5_hash: str = None) -> str:
+    def download_file(cls, url: str, name: str, size: int, file_path: str, md5_hash: str = None, on_progress=None) -> str:
+        """
+        on_progress: 下载进度回调 on_progress(已下载字节数, 文件大小)
+        """
         if Path(file_path).exists():
             print(f"{name} already exists at {file_path}")
+            if on_progress:
+                on_progress(size, size)
             return file_path
         # 下载文件
         print(f"Downloading {name} from {url}")
-        response = requests.get(url, stream=True)
-        data = b""
+        response = requests.get(url, stream=True, timeout=cls.timeout)
+        data = bytearray()
         # 百分比 进度条
-        for chunk in response.iter_content(chunk_size=1024):
+        for chunk in response.iter_content(chunk_size=cls.chunk_size):
             if not chunk:
                 break
             data += chunk
             print(f"\rDownloading {name} ({len(data)}/{size} bytes)", end="")
+            if on_progress:
+                on_progress(len(data), size)
         print(f"\nDownload {name} complete")
         # 检查文件MD5
         print(f"Checking MD5 hash for {name}")
@@ -166,20 +185,14 @@ class PolyhavenHelper:
         return file_path
 
     @classmethod
-    def download_model_files(cls, asset_id: str, expected_resolution: str = "1k") -> dict:
+    def download_model_files(cls, asset_id: str, expected_resolution: str = "1k", on_progress=None) -> dict:
         files = cls.fetch_model_files(asset_id, expected_resolution)
         if not files:
             return {}
         blend_cache_dir = Path(gettempdir()) / f"polyhaven_models/{asset_id}/{expected_resolution}"
         blend_cache_dir.mkdir(parents=True, exist_ok=True)
         blend_cache_path = blend_cache_dir.joinpath(f"{asset_id}.blend").as_posix()
-        url = files["url"]
-        size = int(files["size"])
-        md5_hash = files["md5"]
-        blend_file = cls.download_file(url, asset_id, size, blend_cache_path, md5_hash)
-        out_files = {
-            "blend": blend_file,
-        }
+        downloads = [("blend", asset_id, files, blend_cache_path)]
 
         included_files: dict = files.get("include", {})
         for file_name, info in included_files.items():
@@ -189,11 +202,16 @@ class PolyhavenHelper:
                 continue
             save_path = blend_cache_dir.joinpath(file_name)
             save_path.parent.mkdir(parents=True, exist_ok=True)
-            url = info["url"]
+            downloads.append((file_name, file_name, info, save_path.as_posix()))
+
+        out_files = {}
+        total = sum(int(info["size"]) for _, _, info, _ in downloads)
+        offset = 0
+        for key, name, info, path in downloads:
             size = int(info["size"])
-            md5_hash = info["md5"]
-            texture_file = cls.download_file(url, file_name, size, save_path.as_posix(), md5_hash)
-            out_files[file_name] = texture_file
+            callback = cls.progress_callback(on_progress, name, offset, total)
+            out_files[key] = cls.download_file(info["url"], name, size, path, info["md5"], callback)
+            offset += size
         return out_files
 
 
@@ -372,7 +390,7 @@ class PolyhavenTools(ToolsPackageBase):
         - asset_id: The asset id of the model you want to use.
         - expected_resolution: The expected resolution of the model. Can be "1k", "2k", "4k", "8k", or "16k".
         """
-        files = PolyhavenHelper.download_model_files(asset_id, expected_resolution)
+        files = PolyhavenHelper.download_model_files(asset_id, expected_resolution, PolyhavenTools.report_progress)
         {
             "blend": "xxx/ArmChair_01.blend",
             "textures/Armchair_01_diff_1k.jpg": "xxx/ArmChair_01/textures/Armchair_01_diff_1k.jpg",
@@ -521,7 +539,7 @@ class PolyhavenTools(ToolsPackageBase):
         """
         if expected_resolution not in ["1k", "2k", "4k", "8k", "16k", "32k"]:
             raise ValueError(f"Invalid resolution {expected_resolution}. Expected one of ['1k', '2k', '4k', '8k', '16k', '32k']")
-        file = PolyhavenHelper.download_hdri_file(asset_id, expected_resolution)
+        file = PolyhavenHelper.download_hdri_file(asset_id, expected_resolution, PolyhavenTools.report_progress)
         if not file:
             raise ValueError(f"File for asset {asset_id} and resolution {expected_resolution} not found")
         hdri_file = file["hdri"]
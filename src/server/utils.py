@@ -1,11 +1,46 @@
 import bpy
 import json
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def round_floats(obj, precision=2):
+    """
+    遍历对象, 对浮点数取整(tuple 转为 list, 与json序列化结果一致)
+        NaN/Inf 转为 None: orjson 输出 null, json.dumps 输出非标准的 NaN/Infinity, 统一后两者结果一致
+    """
+    t = type(obj)
+    if t is float:
+        return round(obj, precision) if math.isfinite(obj) else None
+    if t is dict:
+        return {k: round_floats(v, precision) for k, v in obj.items()}
+    if t is list or t is tuple:
+        return [round_floats(v, precision) for v in obj]
+    if isinstance(obj, float):
+        return round(obj, precision) if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: round_floats(v, precision) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [round_floats(v, precision) for v in obj]
+    return obj
 
 
 def rounding_dumps(obj, *args, precision=2, **kwargs):
-    d1 = json.dumps(obj, *args, **kwargs)
-    l1 = json.loads(d1, parse_float=lambda x: round(float(x), precision))
-    return json.dumps(l1, *args, **kwargs)
+    obj = round_floats(obj, precision)
+    # orjson 只输出utf-8(等价于 ensure_ascii=False), 且不支持其它json.dumps参数
+    if orjson and not args and kwargs == {"ensure_ascii": False}:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    # 与 orjson 输出一致的紧凑分隔符(未指定缩进/分隔符时)
+    if "indent" not in kwargs and "separators" not in kwargs:
+        kwargs["separators"] = (",", ":")
+    return json.dumps(obj, *args, **kwargs)
 
 
 def ensure_material_by_name(obj: bpy.types.Object, mat_name: str):
@@ -1,15 +1,247 @@
 import bpy
+import time
 import traceback
-from queue import Queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from collections import deque
+from itertools import count
+from queue import Queue, Empty
+from threading import Lock
 from typing import Any
 
 
+class JobTimeoutError(TimeoutError):
+    pass
+
+
+class JobCancelledError(Exception):
+    pass
+
+
+class CancelToken:
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerJob:
+    __slots__ = ("delegate", "priority", "seq", "enqueue_time", "deadline", "token", "on_drop", "group")
+
+    def __init__(self, delegate: Any, priority: int, seq: int, deadline: float = None, token: CancelToken = None, on_drop=None, group: Any = None):
+        self.delegate = delegate
+        self.priority = priority
+        self.seq = seq
+        self.enqueue_time = time.perf_counter()
+        self.deadline = deadline
+        self.token = token
+        self.on_drop = on_drop
+        self.group = group
+
+    def check(self, now: float):
+        """
+        检查任务是否已取消或超时, 是则返回对应异常
+        """
+        if self.token and self.token.cancelled:
+            return JobCancelledError("Job cancelled before execution")
+        if self.deadline is not None and now > self.deadline:
+            return JobTimeoutError(f"Job expired after waiting {now - self.enqueue_time:.2f}s in queue")
+        return None
+
+
+class FairQueue:
+    """
+    按优先级分层的公平队列
+        不同优先级之间严格按 priority 从小到大出队
+        同一优先级内按 group(如MCP会话) 分别排队, 以加权轮询出队: 每个group每轮最多连续出队 weight 个任务
+        group 为 None 的任务共用一个分组
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.levels: dict[int, dict[Any, deque[TimerJob]]] = {}
+        self.rings: dict[int, deque] = {}
+        self.served: dict[int, int] = {}
+        self.weights: dict[Any, int] = {}
+        self.size = 0
+
+    def put(self, job: TimerJob):
+        with self.lock:
+            groups = self.levels.setdefault(job.priority, {})
+            if job.group not in groups:
+                groups[job.group] = deque()
+                self.rings.setdefault(job.priority, deque()).append(job.group)
+            groups[job.group].append(job)
+            self.size += 1
+
+    def get_nowait(self) -> TimerJob:
+        with self.lock:
+            for priority in sorted(self.levels):
+                ring = self.rings[priority]
+                if not ring:
+                    continue
+                group = ring[0]
+                jobs = self.levels[priority][group]
+                job = jobs.popleft()
+                self.size -= 1
+                served = self.served.get(priority, 0) + 1
+                if not jobs:
+                    ring.popleft()
+                    del self.levels[priority][group]
+                    served = 0
+                elif served >= self.weights.get(group, 1):
+                    ring.rotate(-1)
+                    served = 0
+                self.served[priority] = served
+                return job
+        raise Empty
+
+    def set_weight(self, group: Any, weight: int):
+        with self.lock:
+            self.weights[group] = max(1, int(weight))
+
+    def remove_weight(self, group: Any):
+        with self.lock:
+            self.weights.pop(group, None)
+
+    def group_sizes(self) -> dict:
+        with self.lock:
+            sizes = {}
+            for groups in self.levels.values():
+                for group, jobs in groups.items():
+                    sizes[group] = sizes.get(group, 0) + len(jobs)
+            return sizes
+
+    def qsize(self) -> int:
+        return self.size
+
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def clear(self):
+        with self.lock:
+            self.levels.clear()
+            self.rings.clear()
+            self.served.clear()
+            self.size = 0
+
+
+class ContextOverride:
+    """
+    3D视图 context override 缓存
+        以 window/screen 为key缓存, 切换工作区/screen 或加载文件时失效
+        没有3D视图(或无窗口的后台模式)时退化为不含area的override, 不缓存(把其他区域切换为3D视图不会触发失效), 每次重新查找
+    """
+
+    _cache: dict[tuple[int, int], dict] = {}
+    _owner = object()
+
+    @classmethod
+    def get(cls) -> dict:
+        window = bpy.context.window
+        if not window and (wm := bpy.context.window_manager) and wm.windows:
+            window = wm.windows[0]
+        if not window or not window.screen:
+            return {}
+        screen = window.screen
+        key = (window.as_pointer(), screen.as_pointer())
+        override = cls._cache.get(key)
+        if override is None or not cls.is_valid(override):
+            override = cls.build(window, screen)
+            if "area" in override:
+                cls._cache[key] = override
+            else:
+                cls._cache.pop(key, None)
+        return override
+
+    @classmethod
+    def build(cls, window: bpy.types.Window, screen: bpy.types.Screen) -> dict:
+        override = {"window": window, "screen": screen}
+        area = next((a for a in screen.areas if a.type == "VIEW_3D"), None)
+        if not area:
+            return override
+        override["area"] = area
+        if region := next((r for r in area.regions if r.type == "WINDOW"), None):
+            override["region"] = region
+        return override
+
+    @classmethod
+    def is_valid(cls, override: dict) -> bool:
+        try:
+            # 已释放的area访问属性时会抛出ReferenceError
+            return override["area"].type == "VIEW_3D"
+        except ReferenceError:
+            return False
+
+    @classmethod
+    def invalidate(cls, *args):
+        cls._cache.clear()
+
+    @classmethod
+    def subscribe(cls):
+        for prop in ("workspace", "screen"):
+            bpy.msgbus.subscribe_rna(key=(bpy.types.Window, prop), owner=cls._owner, args=(), notify=cls.invalidate)
+
+    @classmethod
+    def reg(cls):
+        cls.subscribe()
+        bpy.app.handlers.load_post.append(on_load_post)
+
+    @classmethod
+    def unreg(cls):
+        cls.invalidate()
+        bpy.msgbus.clear_by_owner(cls._owner)
+        if on_load_post in bpy.app.handlers.load_post:
+            bpy.app.handlers.load_post.remove(on_load_post)
+
+
+@bpy.app.handlers.persistent
+def on_load_post(*args):
+    # 加载文件会清空msgbus订阅, 需要重新订阅
+    ContextOverride.invalidate()
+    ContextOverride.subscribe()
+
+
 class Timer:
-    TimerQueue = Queue()
+    """
+    主线程调度器
+        put: 投递任务, priority 越小越先执行, 同优先级内按 group 公平轮询(见 FairQueue)
+        run: 由 bpy.app.timers 驱动, 每帧在 frame_budget 时间内按优先级执行任务
+        stats: 队列深度/等待时间等计数
+    注意: bpy.app.timers 无法从其他线程唤醒, 因此空闲时逐步退避(最长一帧), 有任务时立即再次调度
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 10
+    PRIORITY_HOUSEKEEPING = 20
+
+    TimerQueue = FairQueue()
+    frame_budget = 0.008
+    min_interval = 0.001
+    max_interval = 0.016666666666666666
+    _idle_interval = min_interval
+    _seq = count()
+    _stats = {
+        "executed": 0,
+        "dropped": 0,
+        "wait_total": 0.0,
+        "wait_max": 0.0,
+        "wait_last": 0.0,
+        "run_last": 0.0,
+    }
 
     @classmethod
-    def put(cls, delegate: Any):
-        cls.TimerQueue.put(delegate)
+    def put(cls, delegate: Any, priority: int = PRIORITY_NORMAL, deadline: float = None, token: CancelToken = None, on_drop=None, group: Any = None):
+        """
+        deadline: time.perf_counter() 时间点, 超过后任务在执行前被丢弃
+        token: 取消令牌, 取消后任务在执行前被丢弃
+        on_drop: 任务被丢弃时的回调, 参数为对应异常
+        group: 公平调度分组(如MCP会话), 同优先级的不同分组轮流执行
+        """
+        cls.TimerQueue.put(TimerJob(delegate, priority, next(cls._seq), deadline, token, on_drop, group))
+        cls._idle_interval = cls.min_interval
 
     @classmethod
     def executor(cls, t):
@@ -24,61 +256,123 @@ class Timer:
 
     @classmethod
     def run_ex(cls, queue: Queue):
-        while not queue.empty():
-            t = queue.get()
+        start = time.perf_counter()
+        executed = False
+        while time.perf_counter() - start < cls.frame_budget or not executed:
+            try:
+                job = queue.get_nowait()
+            except Empty:
+                break
+            job_start = time.perf_counter()
+            if error := job.check(job_start):
+                cls._stats["dropped"] += 1
+                if job.on_drop:
+                    job.on_drop(error)
+                continue
+            executed = True
+            cls.record_wait(job_start - job.enqueue_time)
             try:
-                cls.executor(t)
+                cls.executor(job.delegate)
             except Exception:
                 traceback.print_exc()
             except KeyboardInterrupt:
                 ...
-        return 0.016666666666666666
+            cls._stats["run_last"] = time.perf_counter() - job_start
+        if executed or not queue.empty():
+            # 有任务时保持高频调度, 下一轮事件循环立即继续
+            cls._idle_interval = cls.min_interval
+            return 0
+        interval = cls._idle_interval
+        cls._idle_interval = min(interval * 2, cls.max_interval)
+        return interval
+
+    @classmethod
+    def record_wait(cls, wait: float):
+        stats = cls._stats
+        stats["executed"] += 1
+        stats["wait_total"] += wait
+        stats["wait_last"] = wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+
+    @classmethod
+    def stats(cls) -> dict:
+        stats = dict(cls._stats)
+        executed = stats["executed"]
+        stats["wait_avg"] = stats.pop("wait_total") / executed if executed else 0.0
+        stats["queue_depth"] = cls.TimerQueue.qsize()
+        return stats
+
+    @classmethod
+    def set_group_weight(cls, group: Any, weight: int):
+        cls.TimerQueue.set_weight(group, weight)
+
+    @classmethod
+    def remove_group(cls, group: Any):
+        cls.TimerQueue.remove_weight(group)
+
+    @classmethod
+    def group_sizes(cls) -> dict:
+        return cls.TimerQueue.group_sizes()
 
     @classmethod
     def clear(cls):
-        while not cls.TimerQueue.empty():
-            cls.TimerQueue.get()
+        cls.TimerQueue.clear()
 
     @classmethod
-    def wait_run(cls, func):
-        def wrap(*args, **kwargs):
-            q = Queue()
+    def get_context_override(cls) -> dict:
+        return ContextOverride.get()
 
-            def wrap_job(q):
-                try:
+    @classmethod
+    def submit(cls, func, args=(), kwargs=None, with_context=False, priority=PRIORITY_INTERACTIVE, deadline=None, token=None, group=None) -> Future:
+        """
+        投递任务到主线程, 返回线程安全的Future(可在asyncio中通过 asyncio.wrap_future 等待)
+        Future 在执行前被取消时任务会被跳过, 超时或token取消时Future设置为 JobTimeoutError/JobCancelledError
+        """
+        future = Future()
+        kwargs = kwargs or {}
+
+        def drop_job(error: Exception):
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+        def wrap_job():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                if with_context:
+                    with bpy.context.temp_override(**cls.get_context_override()):
+                        res = func(*args, **kwargs)
+                else:
                     res = func(*args, **kwargs)
-                    q.put(res)
-                except Exception as e:
-                    q.put(e)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(res)
 
-            cls.put((wrap_job, q))
-            res = q.get()
-            if isinstance(res, Exception):
-                raise res
-            return res
+        cls.put(wrap_job, priority, deadline, token, drop_job, group)
+        return future
 
-        return wrap
+    @classmethod
+    def wait_result(cls, future: Future, timeout: float = None):
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise JobTimeoutError(f"Job not finished in {timeout}s")
 
     @classmethod
-    def wait_run_with_context(cls, func):
+    def wait_run(cls, func, timeout: float = None):
         def wrap(*args, **kwargs):
-            q = Queue()
+            deadline = time.perf_counter() + timeout if timeout else None
+            return cls.wait_result(cls.submit(func, args, kwargs, deadline=deadline), timeout)
 
-            def wrap_job(q):
-                try:
-                    override = bpy.context.copy()
-                    override["area"] = [area for area in bpy.context.screen.areas if area.type == "VIEW_3D"][0]
-                    with bpy.context.temp_override(**override):
-                        res = func(*args, **kwargs)
-                        q.put(res)
-                except Exception as e:
-                    q.put(e)
+        return wrap
 
-            cls.put((wrap_job, q))
-            res = q.get()
-            if isinstance(res, Exception):
-                raise res
-            return res
+    @classmethod
+    def wait_run_with_context(cls, func, timeout: float = None):
+        def wrap(*args, **kwargs):
+            deadline = time.perf_counter() + timeout if timeout else None
+            return cls.wait_result(cls.submit(func, args, kwargs, with_context=True, deadline=deadline), timeout)
 
         return wrap
 
@@ -96,8 +390,10 @@ class Timer:
 
 
 def register():
+    ContextOverride.reg()
     Timer.reg()
 
 
 def unregister():
     Timer.unreg()
+    ContextOverride.unreg()
@@ -1,5 +1,62 @@
 import bpy
 import logging
+from threading import Lock
+from typing import NamedTuple
+
+
+class LogEntry(NamedTuple):
+    role: str
+    content: str
+
+
+class StreamChunk(NamedTuple):
+    """
+    连续的流式片段合并为一条记录, parts 只追加
+    """
+
+    role: str
+    parts: list[str]
+
+
+class MessageLog:
+    """
+    只追加的消息日志, 客户端写入, 文本显示(BTextWriter)按位置读取
+        追加时不复制消息, 只保存显示所需的角色与文本(字符串不可变, 后续修改原消息不影响日志)
+        连续的流式片段合并到同一个 StreamChunk, 每个Token只是一次列表追加
+        clear 时替换为新列表并增加 generation, 读取方据此重置位置
+    """
+
+    def __init__(self):
+        self.entries: list[LogEntry | StreamChunk] = []
+        self.generation = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def to_text(content) -> str:
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            # 图片等非文本内容只显示占位符
+            return "\n".join(part.get("text", "") if part.get("type") == "text" else f"[{part.get('type')}]" for part in content)
+        return "" if content is None else str(content)
+
+    def append(self, role: str, content):
+        entry = LogEntry(role, self.to_text(content))
+        with self.lock:
+            self.entries.append(entry)
+
+    def append_stream(self, content: str, role: str = "streaming"):
+        with self.lock:
+            last = self.entries[-1] if self.entries else None
+            if isinstance(last, StreamChunk) and last.role == role:
+                last.parts.append(content)
+            else:
+                self.entries.append(StreamChunk(role, [content]))
+
+    def clear(self):
+        with self.lock:
+            self.entries = []
+            self.generation += 1
 
 
 class BTextWriter:
@@ -19,76 +76,70 @@ class BTextWriter:
     def __init__(self):
         self.text: bpy.types.Text = None
         self.should_flush = False
+        self.log = MessageLog()
+        self.reset()
+
+    def reset(self):
+        # 已显示的位置: 日志条目数, 最后一条为流式记录时已显示的片段数
+        self.generation = self.log.generation
         self.prev_role = "user"
         self.prev_index = 0
-        self.messages = []
+        self.prev_parts = 0
+        self.lines: list[str] = []
 
     def ensure_text(self):
         if self._text_name not in bpy.data.texts:
             self.text = bpy.data.texts.new(self._text_name)
         self.text = bpy.data.texts[self._text_name]
 
-    def push(self, message):
+    def push(self, message: dict):
         self.should_flush = True
-        self.messages.append(message)
+        self.log.append(message.get("role", "user"), message.get("content", ""))
 
-    def flush1(self):
-        if self.prev_index == len(self.messages):
-            return
-        # 先将光标移到末尾
-        self.text.cursor_set(len(self.text.lines), character=len(self.text.lines[-1].body) * 2)
-        for message in self.messages[self.prev_index :]:
-            role = message.get("role", "user")
-            content = message.get("content", "")
-            line = ""
+    def push_stream(self, content: str):
+        self.should_flush = True
+        self.log.append_stream(content)
+
+    def render_entry(self, entry: LogEntry | StreamChunk):
+        role = entry.role
+        if isinstance(entry, StreamChunk):
             # 收到streaming
-            if role == "streaming":
-                line = "" if self.prev_role == "streaming" else "\n"  # streaming开始时换行
-                line += content
-            elif role != "streaming":
-                line = "" if self.prev_role != "streaming" else "\n"  # streaming结束时换行
-                line += f"{role}:\n{content}\n"
-            self.prev_role = role
-            if not content:
-                continue
-            self.text.write(line)
-        self.prev_index = len(self.messages)
+            self.prev_parts = len(entry.parts)
+            content = "".join(entry.parts[: self.prev_parts])
+            line = "" if self.prev_role == "streaming" else "\n"  # streaming开始时换行
+            line += content
+        else:
+            content = entry.content
+            line = "" if self.prev_role != "streaming" else "\n"  # streaming结束时换行
+            line += f"{role}:\n{content}\n"
+        self.prev_role = role
+        if content:
+            self.lines.append(line)
 
     def flush(self):
-        if self.prev_index == len(self.messages):
-            return
-        # 先将光标移到末尾
-        lines = []
-        for message in self.messages[self.prev_index :]:
-            role = message.get("role", "user")
-            content = message.get("content", "")
-            line = ""
-            # 收到streaming
-            if role == "streaming":
-                line = "" if self.prev_role == "streaming" else "\n"  # streaming开始时换行
-                line += content
-            elif role != "streaming":
-                line = "" if self.prev_role != "streaming" else "\n"  # streaming结束时换行
-                line += f"{role}:\n{content}\n"
-            self.prev_role = role
-            if not content:
-                continue
-            lines.append(line)
-        self.text.from_string("".join(lines))
-        self.prev_index = len(self.messages)
+        if self.generation != self.log.generation:
+            self.reset()
+        entries = self.log.entries
+        count = len(entries)
+        # 上次显示的流式记录之后又收到的片段
+        if self.prev_index and isinstance(last := entries[self.prev_index - 1], StreamChunk) and len(last.parts) > self.prev_parts:
+            parts = len(last.parts)
+            self.lines.append("".join(last.parts[self.prev_parts : parts]))
+            self.prev_parts = parts
+        for entry in entries[self.prev_index : count]:
+            self.render_entry(entry)
+        self.prev_index = count
+        self.text.from_string("".join(self.lines))
 
     def refresh(self):
         # 重新加载文本数据
-        self.text.clear()
-        self.prev_role = "user"
-        self.prev_index = 0
+        self.reset()
         self.flush()
 
     def clear(self):
         self.text.clear()
-        self.messages.clear()
-        self.prev_role = "user"
-        self.prev_index = 0
+        self.log.clear()
+        self.reset()
 
 
 class BTextHandler(logging.StreamHandler):
@@ -118,8 +169,8 @@ def update_text():
         text_writer = BTextWriter.get()
         if not text_writer.should_flush:
             return
-        text_writer.refresh()
         text_writer.should_flush = False
+        text_writer.flush()
     except Exception:
         ...
 